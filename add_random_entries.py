@@ -1,104 +1,321 @@
-import random
+"""Seeded synthetic expenses, from a small demo set to multi-million-row load-test data.
+
+    python add_random_entries.py                                  # 200 rows into expenses.db
+    python add_random_entries.py --rows 1000000 --seed 7          # 1M rows into expenses.db
+    python add_random_entries.py --rows 10000000 --csv big.csv    # 10M rows to CSV (import profile "generic")
+
+The same seed and options always produce the same rows, whatever --workers is. Data is
+generated one calendar month at a time with numpy: merchants are drawn with a Zipf-like
+popularity (a few places account for most visits), amounts are log-normal around each
+merchant's typical price with a Pareto tail of occasional big purchases, volume follows the
+season (December shopping, summer travel, weekend dining) and every simulated household pays
+the same bills around the same day each month. Months are independent, so large runs spread
+them over worker processes; rows come out in date order either way.
+"""
+
+import argparse
+import math
+import os
+import time
 from datetime import date, timedelta
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
 from db import ExpenseDB
-from categorizer import CategoryRules
 
-# Sample descriptions for each category
+
+# Sample descriptions for each category; earlier entries are the more popular merchants
 DESCRIPTIONS = {
     "Food": [
-        "Pizza from Domino's", "Burger at McDonald's", "Groceries from supermarket",
-        "Dinner at restaurant", "Coffee at cafe", "Lunch at food court",
-        "Breakfast sandwich", "Snacks from store", "Fast food meal",
-        "Restaurant dinner", "Food delivery", "Grocery shopping"
+        "Groceries from supermarket", "Coffee at cafe", "Lunch at food court", "Food delivery",
+        "Pizza from Domino's", "Burger at McDonald's", "Dinner at restaurant", "Breakfast sandwich",
+        "Snacks from store", "Fast food meal", "Restaurant dinner", "Grocery shopping",
     ],
     "Travel": [
-        "Uber ride to office", "Taxi fare", "Bus ticket",
-        "Train ticket", "Fuel for car", "Petrol station",
-        "Ola ride home", "Airport taxi", "Metro card recharge",
-        "Parking fee", "Car service", "Travel expenses"
+        "Uber ride to office", "Metro card recharge", "Ola ride home", "Fuel for car",
+        "Taxi fare", "Bus ticket", "Train ticket", "Petrol station",
+        "Parking fee", "Airport taxi", "Car service", "Flight booking",
     ],
     "Shopping": [
-        "Amazon purchase", "Flipkart order", "Clothes from mall",
-        "Electronics shopping", "Online shopping", "Mall shopping",
-        "Book store", "Gift purchase", "Shopping spree",
-        "Retail store", "Department store", "Online order"
+        "Amazon purchase", "Flipkart order", "Online shopping", "Clothes from mall",
+        "Electronics shopping", "Mall shopping", "Book store", "Gift purchase",
+        "Retail store", "Department store", "Online order", "Shopping spree",
     ],
     "Bills": [
-        "Electricity bill", "Water bill", "Internet bill",
-        "WiFi recharge", "Mobile recharge", "Phone bill",
-        "Rent payment", "Utility bill", "Monthly subscription",
-        "Cable TV bill", "Gas bill", "Internet plan"
+        "Water bill", "Gas bill", "WiFi recharge", "Cable TV bill", "Utility bill", "Phone bill",
     ],
     "Entertainment": [
-        "Movie tickets", "Netflix subscription", "Spotify premium",
-        "Gaming purchase", "Concert tickets", "Entertainment",
-        "Streaming service", "Video game", "Movie night",
-        "Music subscription", "Theater tickets", "Entertainment expense"
+        "Movie tickets", "Gaming purchase", "Concert tickets", "Streaming service",
+        "Video game", "Movie night", "Theater tickets", "Entertainment expense",
     ],
     "Health": [
-        "Doctor visit", "Pharmacy medicine", "Hospital bill",
-        "Gym membership", "Medical checkup", "Health insurance",
-        "Medicine purchase", "Dental checkup", "Fitness class",
-        "Vitamin supplements", "Health products", "Medical expense"
+        "Pharmacy medicine", "Doctor visit", "Medicine purchase", "Medical checkup",
+        "Dental checkup", "Fitness class", "Vitamin supplements", "Hospital bill",
     ],
     "Other": [
-        "Misc expense", "Unknown purchase", "General expense",
-        "Various items", "Other purchase", "Miscellaneous",
-        "Random expense", "General shopping", "Other items"
-    ]
+        "Misc expense", "General expense", "Various items", "Other purchase",
+        "Miscellaneous", "Random expense", "Other items",
+    ],
 }
 
-def add_random_entries(count=200):
-    db = ExpenseDB(db_path="expenses.db")
-    rules = CategoryRules(path="categories.json")
-    
-    # Generate dates over the past 6 months
-    today = date.today()
-    start_date = today - timedelta(days=180)  # 6 months ago
-    
-    added = 0
-    for i in range(count):
-        # Random date within last 6 months
-        days_ago = random.randint(0, 180)
-        expense_date = today - timedelta(days=days_ago)
-        
-        # Random category
-        category = random.choice(list(DESCRIPTIONS.keys()))
-        
-        # Random description from that category
-        description = random.choice(DESCRIPTIONS[category])
-        
-        # Random amount (different ranges for different categories)
-        if category == "Food":
-            amount = round(random.uniform(50, 1500), 2)
-        elif category == "Travel":
-            amount = round(random.uniform(30, 800), 2)
-        elif category == "Shopping":
-            amount = round(random.uniform(100, 5000), 2)
-        elif category == "Bills":
-            amount = round(random.uniform(200, 5000), 2)
-        elif category == "Entertainment":
-            amount = round(random.uniform(100, 2000), 2)
-        elif category == "Health":
-            amount = round(random.uniform(150, 3000), 2)
-        else:
-            amount = round(random.uniform(50, 1000), 2)
-        
-        # Add the expense
-        db.add_expense(
-            date_iso=expense_date.isoformat(),
-            amount=amount,
-            description=description,
-            category=category
+# Share of the non-recurring rows, typical (median) amount and spread per category
+CATEGORY_MIX = {
+    "Food": (0.36, 320.0, 0.55),
+    "Travel": (0.20, 220.0, 0.60),
+    "Shopping": (0.16, 1100.0, 0.75),
+    "Bills": (0.04, 650.0, 0.40),
+    "Entertainment": (0.10, 480.0, 0.60),
+    "Health": (0.07, 700.0, 0.70),
+    "Other": (0.07, 300.0, 0.80),
+}
+
+# Monthly bills every household pays: (description, category, typical amount, day of month)
+BILLS = [
+    ("Rent payment", "Bills", 15000.0, 1),
+    ("Gym membership", "Health", 1500.0, 3),
+    ("Electricity bill", "Bills", 1800.0, 6),
+    ("Internet bill", "Bills", 799.0, 10),
+    ("Mobile recharge", "Bills", 399.0, 14),
+    ("Netflix subscription", "Entertainment", 649.0, 20),
+    ("Spotify premium", "Entertainment", 119.0, 22),
+]
+
+RECURRING_SHARE = 0.05  # target fraction of rows that are monthly bills
+TAIL_PROBABILITY = 0.01  # rows that are an occasional big purchase
+ZIPF_EXPONENT = 1.1
+
+CATEGORIES = list(DESCRIPTIONS)
+DESCRIPTION_LIST = [text for category in CATEGORIES for text in DESCRIPTIONS[category]] + [bill[0] for bill in BILLS]
+DESCRIPTION_CATEGORY = np.array(
+    [CATEGORIES.index(category) for category in CATEGORIES for _ in DESCRIPTIONS[category]]
+    + [CATEGORIES.index(bill[1]) for bill in BILLS]
+)
+_BILL_OFFSET = len(DESCRIPTION_LIST) - len(BILLS)
+
+
+def _day_weights(days: np.ndarray) -> np.ndarray:
+    """Relative volume per (category, day) for datetime64[D] `days`."""
+    month = days.astype("datetime64[M]").astype(int) % 12 + 1
+    weekday = (days.astype(int) + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+    day_of_year = (days - days.astype("datetime64[Y]")).astype(int)
+    # Mild yearly wave peaking around New Year
+    base = 1.0 + 0.12 * np.cos(2 * np.pi * (day_of_year - 358) / 365.25)
+    weekend = weekday >= 4  # Friday to Sunday
+    weights = np.tile(base, (len(CATEGORIES), 1))
+    weights[CATEGORIES.index("Food")] *= np.where(weekend, 1.3, 1.0)
+    weights[CATEGORIES.index("Entertainment")] *= np.where(weekend, 1.6, 0.85)
+    weights[CATEGORIES.index("Shopping")] *= np.where(np.isin(month, (11, 12)), 1.8, 1.0)
+    weights[CATEGORIES.index("Travel")] *= np.where(np.isin(month, (5, 6, 12)), 1.4, 1.0)
+    weights[CATEGORIES.index("Health")] *= np.where(month == 1, 1.3, 1.0)
+    return weights
+
+
+def _catalogue(seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Popularity (per category) and typical amount of every merchant, fixed by the seed."""
+    rng = np.random.default_rng([seed, 1])
+    popularity = np.zeros(len(DESCRIPTION_LIST))
+    medians = np.zeros(len(DESCRIPTION_LIST))
+    start = 0
+    for category in CATEGORIES:
+        count = len(DESCRIPTIONS[category])
+        ranks = np.arange(1, count + 1)
+        popularity[start:start + count] = ranks ** -ZIPF_EXPONENT / np.sum(ranks ** -ZIPF_EXPONENT)
+        medians[start:start + count] = CATEGORY_MIX[category][1] * rng.lognormal(0.0, 0.45, count)
+        start += count
+    return popularity, medians
+
+
+def _households(seed: int, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per household and bill: fixed amount and day-of-month shift."""
+    rng = np.random.default_rng([seed, 2])
+    typical = np.array([bill[2] for bill in BILLS])
+    amounts = np.round(typical * rng.lognormal(0.0, 0.3, (count, len(BILLS))), 0)
+    shifts = rng.integers(0, 3, (count, len(BILLS)))
+    return amounts, shifts
+
+
+def plan(rows: int, start: date, end: date) -> List[Dict]:
+    """Split `rows` over the calendar months of [start, end] in proportion to expected volume.
+
+    Each task is self-contained and tiny, so workers get them by pickling. Households (and so
+    recurring rows) scale with the dataset; what is left is spread by the seasonal weights.
+    """
+    days = np.arange(np.datetime64(start.isoformat()), np.datetime64(end.isoformat()) + 1)
+    month_of_day = days.astype("datetime64[M]")
+    months = np.unique(month_of_day)
+    bill_days = 0
+    for month in months:
+        in_month = days[month_of_day == month]
+        month_start = month.astype("datetime64[D]")
+        bill_days += sum(1 for bill in BILLS if in_month[0] <= month_start + bill[3] - 1 <= in_month[-1])
+    households = round(rows * RECURRING_SHARE / bill_days) if bill_days else 0
+    if households == 0 and bill_days and bill_days * 4 <= rows:
+        households = 1
+    random_rows = rows - households * bill_days
+
+    mix = np.array([CATEGORY_MIX[category][0] for category in CATEGORIES])
+    weights = _day_weights(days)
+    weights = weights / weights.mean(axis=1, keepdims=True) * mix[:, None]
+    month_volume = np.array([weights[:, month_of_day == month].sum() for month in months])
+    # Largest-remainder rounding so the months add up to exactly random_rows
+    exact = random_rows * month_volume / month_volume.sum()
+    counts = np.floor(exact).astype(int)
+    counts[np.argsort(exact - counts)[::-1][: random_rows - counts.sum()]] += 1
+
+    tasks = []
+    for index, month in enumerate(months):
+        mask = month_of_day == month
+        tasks.append(
+            {
+                "index": index,
+                "first_day": str(days[mask][0]),
+                "weights": weights[:, mask],
+                "rows": int(counts[index]),
+                "households": households,
+            }
         )
-        added += 1
-        
-        if (i + 1) % 50 == 0:
-            print(f"Added {i + 1}/{count} entries...")
-    
-    print(f"\nSuccessfully added {added} random expense entries!")
-    print(f"Date range: {start_date.isoformat()} to {today.isoformat()}")
+    return tasks
 
-if __name__ == "__main__":
-    add_random_entries(200)
 
+def generate_month(seed: int, task: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(day offset, amount, description index) arrays for one month, sorted by day.
+
+    Seeded by (seed, month index), so a month's rows never depend on how work was split.
+    """
+    rng = np.random.default_rng([seed, 3, task["index"]])
+    popularity, medians = _catalogue(seed)
+    weights = task["weights"]
+    n_days = weights.shape[1]
+    n = task["rows"]
+
+    category_volume = weights.sum(axis=1)
+    categories = rng.choice(len(CATEGORIES), size=n, p=category_volume / category_volume.sum())
+    day = np.empty(n, dtype=np.int64)
+    description = np.empty(n, dtype=np.int64)
+    for c in range(len(CATEGORIES)):
+        rows = np.flatnonzero(categories == c)
+        if not len(rows):
+            continue
+        cumulative = np.cumsum(weights[c])
+        day[rows] = np.searchsorted(cumulative, rng.random(len(rows)) * cumulative[-1], side="right")
+        merchants = np.flatnonzero(DESCRIPTION_CATEGORY[:_BILL_OFFSET] == c)
+        description[rows] = rng.choice(merchants, size=len(rows), p=popularity[merchants])
+    sigma = np.array([CATEGORY_MIX[category][2] for category in CATEGORIES])[categories]
+    amount = medians[description] * np.exp(sigma * rng.standard_normal(n))
+    tail = rng.random(n) < TAIL_PROBABILITY
+    amount[tail] *= np.minimum(1.0 + rng.pareto(1.5, int(tail.sum())), 50.0)
+    amount = np.maximum(np.round(amount, 2), 10.0)
+
+    households = task["households"]
+    if households:
+        bill_amounts, shifts = _households(seed, households)
+        first = date.fromisoformat(task["first_day"])
+        month_start = first.replace(day=1)
+        base_day = np.array([bill[3] - 1 for bill in BILLS]) - (first - month_start).days
+        # Which bills fall in this month is decided by their nominal day, as in plan()
+        keep = np.broadcast_to((base_day >= 0) & (base_day < n_days), shifts.shape)
+        bill_day = np.minimum(base_day + shifts, n_days - 1)
+        bill_amount = bill_amounts.copy()
+        # Electricity follows the weather
+        electricity = [bill[0] for bill in BILLS].index("Electricity bill")
+        summer = 1.0 + 0.35 * math.cos(2 * math.pi * (first.month - 5) / 12)
+        bill_amount[:, electricity] = np.round(bill_amount[:, electricity] * summer * rng.lognormal(0.0, 0.08, households), 0)
+        day = np.concatenate([day, bill_day[keep]])
+        amount = np.concatenate([amount, bill_amount[keep]])
+        description = np.concatenate([description, (_BILL_OFFSET + np.arange(len(BILLS)))[np.nonzero(keep)[1]]])
+
+    order = np.argsort(day, kind="stable")
+    return day[order], amount[order], description[order]
+
+
+def _month_dates(task: Dict) -> List[str]:
+    first = date.fromisoformat(task["first_day"])
+    return [(first + timedelta(days=offset)).isoformat() for offset in range(task["weights"].shape[1])]
+
+
+def _month_csv(args: Tuple[int, Dict]) -> str:
+    seed, task = args
+    day, amount, description = generate_month(seed, task)
+    dates = _month_dates(task)
+    labels = [f"{text},{CATEGORIES[category]}\n" for text, category in zip(DESCRIPTION_LIST, DESCRIPTION_CATEGORY)]
+    return "".join([f"{dates[d]},{a:.2f},{labels[m]}" for d, a, m in zip(day.tolist(), amount.tolist(), description.tolist())])
+
+
+def _month_rows(args: Tuple[int, Dict]) -> List[Tuple[str, float, str, str, None]]:
+    seed, task = args
+    day, amount, description = generate_month(seed, task)
+    dates = _month_dates(task)
+    categories = [CATEGORIES[category] for category in DESCRIPTION_CATEGORY]
+    # No content hash: generated rows are never deduplicated
+    return [
+        (dates[d], a, DESCRIPTION_LIST[m], categories[m], None)
+        for d, a, m in zip(day.tolist(), amount.tolist(), description.tolist())
+    ]
+
+
+def _run(worker, seed: int, tasks: List[Dict], workers: int) -> Iterator:
+    jobs = [(seed, task) for task in tasks]
+    if workers <= 1:
+        yield from map(worker, jobs)
+        return
+    with Pool(workers) as pool:
+        # imap keeps month order while later months are generated in the background
+        yield from pool.imap(worker, jobs)
+
+
+def write_csv(path: str, rows: int, seed: int, start: date, end: date, workers: int = 1) -> int:
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write("date,amount,description,category\n")
+        for text in _run(_month_csv, seed, plan(rows, start, end), workers):
+            f.write(text)
+            written += text.count("\n")
+    return written
+
+
+def load_db(db: ExpenseDB, rows: int, seed: int, start: date, end: date, workers: int = 1) -> int:
+    """Stream the generated months into `db` in one bulk transaction."""
+    return db.bulk_load(_run(_month_rows, seed, plan(rows, start, end), workers), expected_rows=rows, hashed=False)
+
+
+def add_random_entries(count: int = 200, db_path: str = "expenses.db", seed: Optional[int] = None) -> int:
+    """Add `count` generated expenses over the past year (the old demo-data entry point)."""
+    today = date.today()
+    return load_db(ExpenseDB(db_path=db_path), count, seed if seed is not None else 42, today - timedelta(days=365), today)
+
+
+def main() -> None:
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic expenses")
+    parser.add_argument("--rows", type=int, default=200, help="Number of expenses (1k to 10M+)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=date.fromisoformat, default=today - timedelta(days=365), help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=today, help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--csv", type=str, default=None, help="Write a CSV file instead of loading the database")
+    parser.add_argument("--db", type=str, default="expenses.db")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Generator processes (default: one per core from 1M rows, otherwise 1)",
+    )
+    args = parser.parse_args()
+    if args.end < args.start:
+        parser.error("--end is before --start")
+    workers = args.workers or ((os.cpu_count() or 1) if args.rows >= 1_000_000 else 1)
+
+    started = time.perf_counter()
+    if args.csv:
+        count = write_csv(args.csv, args.rows, args.seed, args.start, args.end, workers)
+        target = os.path.abspath(args.csv)
+    else:
+        count = load_db(ExpenseDB(db_path=args.db), args.rows, args.seed, args.start, args.end, workers)
+        target = args.db
+    elapsed = time.perf_counter() - started
+    print(f"Generated {count} expenses ({args.start} to {args.end}, seed {args.seed}) into {target} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
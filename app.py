@@ -1,22 +1,68 @@
+import csv
+import io
+import os
+import queue
 from datetime import date
 from typing import Optional
 
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, flash
 
 from db import ExpenseDB
 from categorizer import CategoryRules
 from predictor import Predictor
+from importer import import_csv, load_profiles
+from cache import PageCache, cached_page
+from budgets import budget_warnings
+from recurring import RecurringScheduler
+from events import EventBroker
 
 
 app = Flask(__name__)
-app.secret_key = "dev-secret"
+# Every worker must share the key, or a flash set by one worker cannot be read by another
+app.secret_key = os.environ.get("SECRET_KEY", "dev-secret")
 
-db = ExpenseDB(db_path="expenses.db")
-rules = CategoryRules(path="categories.json")
-predictor = Predictor(db)
+db: ExpenseDB
+rules: CategoryRules
+predictor: Predictor
+scheduler: RecurringScheduler
+broker: EventBroker
+page_cache = PageCache(max_bytes=16 * 1024 * 1024)
+# How long a dashboard turned away from /events waits before reconnecting
+EVENT_RETRY_MS = 30000
+
+
+def init_worker() -> None:
+    """(Re)create the per-process state.
+
+    Runs at import time, and again from serve.py after each fork when the app was preloaded
+    in the master, so every worker process owns its own objects and an empty page cache.
+    """
+    global db, rules, predictor, scheduler, broker
+    db = ExpenseDB(db_path=os.environ.get("EXPENSES_DB", "expenses.db"))
+    rules = CategoryRules(path=os.environ.get("EXPENSES_CATEGORIES", "categories.json"))
+    predictor = Predictor(db)
+    scheduler = RecurringScheduler(db)
+    # Each open event stream pins one server thread; serve.py keeps this below --threads
+    broker = EventBroker(db, max_subscribers=int(os.environ.get("EVENT_STREAMS", 4)))
+    page_cache.clear()
+
+
+def _data_version() -> int:
+    return db.data_version()
+
+
+init_worker()
+
+
+@app.before_request
+def materialize_recurring():
+    # Usually just a peek at the scheduler heap; writes only when an occurrence falls due
+    if scheduler.run_due():
+        broker.notify()
 
 
 @app.route("/")
+@cached_page(page_cache, _data_version)
 def index():
     summary_month = db.get_summary("month")
     expenses = db.list_expenses(limit=5)
@@ -41,35 +87,118 @@ def add():
         if amount <= 0 or not description:
             flash("Please provide a valid amount and description.")
             return redirect(url_for("add"))
-        db.add_expense(date_iso=date_iso, amount=amount, description=description, category=category)
+        try:
+            db.add_expense(date_iso=date_iso, amount=amount, description=description, category=category)
+        except ValueError as exc:
+            flash(f"Could not add expense: {exc}")
+            return redirect(url_for("add"))
+        broker.notify()
         flash("Expense added!")
+        for warning in budget_warnings(db, category, date_iso):
+            flash(warning)
         return redirect(url_for("index"))
     return render_template("add.html", today=date.today().isoformat())
 
 
 @app.route("/list")
+@cached_page(page_cache, _data_version)
 def list_expenses():
     category = request.args.get("category")
     start = request.args.get("start")
     end = request.args.get("end")
-    expenses = db.list_expenses(start_date=start or None, end_date=end or None, category=category or None, limit=200)
-    return render_template("list.html", expenses=expenses)
+    tags = request.args.get("tags", "").strip()
+    error = None
+    try:
+        expenses = db.list_expenses(
+            start_date=start or None, end_date=end or None, category=category or None, limit=200, tags=tags or None
+        )
+    except ValueError as exc:
+        expenses, error = [], str(exc)
+    return render_template("list.html", expenses=expenses, tags=tags, error=error, top_tags=db.list_tags(limit=20))
 
 
 @app.route("/summary")
+@cached_page(page_cache, _data_version)
 def summary():
     period = request.args.get("period", "month")
-    summary_data = db.get_summary(period)
-    return render_template("summary.html", period=period, summary=summary_data)
+    tags = request.args.get("tags", "").strip()
+    error = None
+    try:
+        summary_data = db.get_summary(period, tags=tags or None)
+    except ValueError as exc:
+        summary_data, error = {"total": 0.0, "by_category": {}}, str(exc)
+    return render_template("summary.html", period=period, summary=summary_data, tags=tags, error=error)
 
 
 @app.route("/predict")
+@cached_page(page_cache, _data_version)
 def predict():
     months = int(request.args.get("months", "6"))
     forecast = predictor.predict_next_month(months_back=months)
     return render_template("predict.html", months=months, forecast=forecast)
 
 
+@app.route("/import", methods=["GET", "POST"])
+def import_statement():
+    profiles = load_profiles()
+    if request.method == "POST":
+        upload = request.files.get("file")
+        profile_name = request.form.get("profile", "generic")
+        if not upload or not upload.filename or profile_name not in profiles:
+            flash("Please choose a CSV file and a valid profile.")
+            return redirect(url_for("import_statement"))
+        # Wrap the upload stream directly so large statements are never read into memory at once
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        try:
+            stats = import_csv(db, rules, stream, profiles[profile_name])
+        except (UnicodeDecodeError, csv.Error) as exc:
+            # The import is one transaction, so nothing from the broken file was written
+            flash(f"Could not read the file (save it as UTF-8 CSV and try again): {exc}")
+            return redirect(url_for("import_statement"))
+        broker.notify()
+        flash(
+            f"Imported {stats['inserted']} new expense(s) from {stats['read']} row(s) "
+            f"({stats['duplicates']} duplicate(s), {stats['skipped']} skipped)."
+        )
+        return redirect(url_for("list_expenses"))
+    return render_template("import.html", profiles=sorted(profiles))
+
+
+@app.route("/events")
+def events():
+    """Server-Sent Events stream of dashboard deltas (new rows, this month's totals)."""
+    subscription = broker.subscribe()
+    if subscription is None:
+        # Every stream slot of this worker is taken. A 503 would make EventSource give up for
+        # good, so answer with a retry interval and close; the browser tries again later,
+        # possibly landing on a less busy worker.
+        response = Response(f"retry: {EVENT_RETRY_MS}\n\n", mimetype="text/event-stream")
+        response.headers["Retry-After"] = str(EVENT_RETRY_MS // 1000)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = subscription.get(timeout=15)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield f"event: delta\ndata: {message}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = Response(stream(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @app.route("/chat", methods=["GET", "POST"])
 def chat():
     from bot import ChatBot
@@ -80,11 +209,11 @@ def chat():
         user_text = request.form.get("message", "").strip()
         if user_text:
             response = ChatBot(db=db, rules=rules).respond(user_text)
+            broker.notify()
     return render_template("chat.html", user_text=user_text, response=response)
 
 
 if __name__ == "__main__":
-    import os
     port_str = os.environ.get("PORT", "5000")
     try:
         port = int(port_str)
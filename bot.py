@@ -1,10 +1,12 @@
 import re
 from datetime import date, timedelta, datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 
 from db import ExpenseDB
 from categorizer import CategoryRules
 from predictor import Predictor
+from budgets import budget_warnings
+from nlquery import parse_categories, parse_date_range, parse_question
 
 
 class ChatBot:
@@ -13,8 +15,8 @@ class ChatBot:
         self.rules = rules
         self.predictor = Predictor(db)
 
-    def _parse_add_intent(self, text: str) -> Optional[str]:
-        """Enhanced add expense parser with multiple patterns"""
+    def _extract_expense(self, text: str) -> Optional[Tuple[str, float, str]]:
+        """Parse an add-expense message into (date_iso, amount, description) without saving it"""
         lowered = text.lower()
         
         # Pattern 1: "spent 100 on food", "spent 50 for taxi"
@@ -63,6 +65,11 @@ class ChatBot:
             date_match = re.search(r"on\s+(\d{4}-\d{2}-\d{2})", text, re.IGNORECASE)
             if date_match:
                 date_iso = date_match.group(1)
+                try:
+                    date.fromisoformat(date_iso)
+                except ValueError:
+                    # "2025-02-30" is not a day; treat the message as unreadable
+                    return None
         
         # Clean description
         description = re.sub(r"\s+(?:yesterday|today|on\s+\d{4}-\d{2}-\d{2}).*$", "", description, flags=re.IGNORECASE).strip()
@@ -70,9 +77,68 @@ class ChatBot:
         if not description or description == "":
             description = "misc"
         
+        return date_iso, amount, description
+
+    def _parse_add_intent(self, text: str) -> Optional[str]:
+        """Enhanced add expense parser with multiple patterns"""
+        parsed = self._extract_expense(text)
+        if parsed is None:
+            return None
+        date_iso, amount, description = parsed
         category = self.rules.categorize(description)
-        expense_id = self.db.add_expense(date_iso=date_iso, amount=amount, description=description, category=category)
-        return f"✅ Added expense #{expense_id}: ₹{amount:.2f} ({category}) - {description} on {date_iso}"
+        try:
+            expense_id = self.db.add_expense(date_iso=date_iso, amount=amount, description=description, category=category)
+        except ValueError as error:
+            return f"❌ Could not add expense: {error}"
+        result = [f"✅ Added expense #{expense_id}: ₹{amount:.2f} ({category}) - {description} on {date_iso}"]
+        result.extend(budget_warnings(self.db, category, date_iso))
+        return "\n".join(result)
+
+    def respond_batch(self, lines: List[str]) -> str:
+        """Add every parseable line of a pasted log in one transaction and report the rest"""
+        parsed: List[Tuple[str, float, str]] = []
+        failed: List[Tuple[int, str]] = []
+        archived: List[Tuple[int, str]] = []
+        archived_years = {archive["year"] for archive in self.db.list_archives()}
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            expense = self._extract_expense(line)
+            if expense is None:
+                failed.append((number, line))
+            elif int(expense[0][:4]) in archived_years:
+                archived.append((number, line))
+            else:
+                parsed.append(expense)
+
+        if parsed:
+            categories = self.rules.categorize_many([description for _, _, description in parsed])
+            rows = [(d, amount, description, category, None) for (d, amount, description), category in zip(parsed, categories)]
+            self.db.add_expenses_bulk(rows)
+
+        result = [f"✅ Added {len(parsed)} expense(s), total ₹{sum(amount for _, amount, _ in parsed):.2f}"]
+        if parsed:
+            by_category: Dict[str, float] = {}
+            for (_, amount, _), category in zip(parsed, categories):
+                by_category[category] = by_category.get(category, 0.0) + amount
+            sorted_cats = sorted(by_category.items(), key=lambda x: -x[1])
+            result.append("By category: " + ", ".join(f"{cat}: ₹{amt:.2f}" for cat, amt in sorted_cats))
+            # One check per category, against the period of its most recent pasted line
+            latest: Dict[str, str] = {}
+            for (date_iso, _, _), category in zip(parsed, categories):
+                latest[category] = max(latest.get(category, date_iso), date_iso)
+            for category, date_iso in sorted(latest.items()):
+                result.extend(budget_warnings(self.db, category, date_iso))
+        if failed:
+            result.append(f"⚠️ Could not read {len(failed)} line(s):")
+            for number, line in failed:
+                result.append(f"  • line {number}: {line}")
+        if archived:
+            result.append(f"⚠️ Skipped {len(archived)} line(s) dated in archived years:")
+            for number, line in archived:
+                result.append(f"  • line {number}: {line}")
+        return "\n".join(result)
 
     def _parse_summary_intent(self, text: str) -> Optional[str]:
         """Enhanced summary parser with better period detection"""
@@ -119,23 +185,11 @@ class ChatBot:
         if not any(word in lowered for word in ["list", "show", "display", "expenses", "transactions", "history"]):
             return None
         
-        # Parse category filter
-        category = None
-        for cat in ["food", "travel", "shopping", "bills", "entertainment", "health", "other"]:
-            if cat in lowered:
-                category = cat.capitalize()
-                break
-        
-        # Parse date filters
-        start_date = None
-        end_date = None
-        
-        if "last week" in lowered or "past week" in lowered:
-            end_date = date.today().isoformat()
-            start_date = (date.today() - timedelta(days=7)).isoformat()
-        elif "last month" in lowered or "past month" in lowered:
-            end_date = date.today().isoformat()
-            start_date = (date.today() - timedelta(days=30)).isoformat()
+        # Parse category and date filters
+        mentioned = parse_categories(lowered, self._category_names())
+        category = mentioned[0] if mentioned else None
+        date_range = parse_date_range(lowered)
+        start_date, end_date = date_range[:2] if date_range else (None, None)
         
         expenses = self.db.list_expenses(start_date=start_date, end_date=end_date, category=category, limit=10)
         
@@ -151,22 +205,69 @@ class ChatBot:
         
         return "\n".join(result)
 
-    def _parse_category_intent(self, text: str) -> Optional[str]:
-        """Category-specific queries"""
+    def _category_names(self) -> List[str]:
+        # Rules may already define "Other" (or "other"); list every name once, case-insensitively
+        names: Dict[str, str] = {}
+        for name in list(self.rules.get_rules().keys()) + ["Other"]:
+            names.setdefault(name.lower(), name)
+        return list(names.values())
+
+    def _parse_query_intent(self, text: str) -> Optional[str]:
+        """Spending questions: "how much on food last month", "food vs travel over the last 3 months by week".
+
+        The question is parsed into a query AST (nlquery.parse_question) and answered by one
+        aggregate over just the categories and dates it names.
+        """
         lowered = text.lower()
-        
-        # Check for category-specific questions
-        for cat in ["food", "travel", "shopping", "bills", "entertainment", "health", "other"]:
-            if cat in lowered and any(word in lowered for word in ["how much", "spent", "total", "spending"]):
-                category = cat.capitalize()
-                summary = self.db.get_summary("month")
-                amount = summary["by_category"].get(category, 0)
-                if amount == 0:
-                    return f"No expenses found for {category} this month."
-                percentage = (amount / summary["total"]) * 100 if summary["total"] > 0 else 0
-                return f"💰 {category} expenses this month: ₹{amount:.2f} ({percentage:.1f}% of total)"
-        
-        return None
+        if not re.search(r"\b(how much|how many|spent|spend|spending|total|average|avg|count|vs|versus|compare|"
+                         r"largest|biggest|highest|smallest|cheapest|lowest)\b", lowered):
+            return None
+        query = parse_question(lowered, self._category_names())
+        # Plain period totals ("total this month") keep the fuller summary answer
+        simple_period = not query["explicit_range"] or query["label"] in {"today", "this week", "this month", "all time"}
+        if not query["categories"] and not query["group_by"] and query["metric"] == "sum" and simple_period:
+            return None
+
+        rows = self.db.aggregate(
+            metric=query["metric"],
+            start_date=query["start"],
+            end_date=query["end"],
+            categories=query["categories"],
+            group_by=query["group_by"],
+        )
+        subject = " vs ".join(query["categories"]) or "all categories"
+        if not rows:
+            return f"No expenses found for {subject} ({query['label']})."
+
+        def fmt(value: float) -> str:
+            return f"{value:.0f}" if query["metric"] == "count" else f"₹{value:.2f}"
+
+        metric_label = {
+            "sum": "Spending on",
+            "count": "Number of expenses in",
+            "avg": "Average expense in",
+            "min": "Smallest expense in",
+            "max": "Largest expense in",
+        }[query["metric"]]
+        header = f"💰 {metric_label} {subject} ({query['label']}):"
+        if query["group_by"] in {"day", "week", "month"}:
+            result = [header]
+            buckets: Dict[str, List[str]] = {}
+            for row in rows:
+                part = fmt(row["value"]) if row["category"] is None else f"{row['category']} {fmt(row['value'])}"
+                buckets.setdefault(row["bucket"], []).append(part)
+            prefix = "week of " if query["group_by"] == "week" else ""
+            for bucket, parts in buckets.items():
+                result.append(f"  • {prefix}{bucket}: " + " | ".join(parts))
+            return "\n".join(result)
+        if len(rows) == 1:
+            return f"{header} {fmt(rows[0]['value'])}"
+        result = [header]
+        for row in sorted(rows, key=lambda r: -r["value"]):
+            result.append(f"  • {row['category']}: {fmt(row['value'])}")
+        if query["metric"] in {"sum", "count"} and len(rows) > 1:
+            result.append(f"  Total: {fmt(sum(row['value'] for row in rows))}")
+        return "\n".join(result)
 
     def _parse_predict_intent(self, text: str) -> Optional[str]:
         """Enhanced prediction with better formatting"""
@@ -249,10 +350,12 @@ class ChatBot:
 • Add expenses: "spent 100 on food", "add 50 for taxi", "100 on coffee"
 • View summaries: "show summary", "total this month", "how much today"
 • List expenses: "list expenses", "show my transactions", "show food expenses"
-• Category queries: "how much on food", "travel expenses"
+• Questions: "how much on food last month", "food vs travel over the last 3 months by week",
+  "average travel expense this year", "how many shopping purchases since March"
 • Predictions: "predict next month", "forecast"
 • Top categories: "biggest category", "top spending"
 • Statistics: "show stats", "insights"
+• Bulk add: paste several lines like "spent 120 on uber" (one expense per line)
 
 Try: "spent 150 on groceries" or "show summary this month"
 """
@@ -264,12 +367,17 @@ Try: "spent 150 on groceries" or "show summary this month"
         
         text = text.strip()
         
+        # Pasted transaction logs: several lines at once are ingested as a batch
+        lines = [line for line in text.splitlines() if line.strip()]
+        if len(lines) > 1:
+            return self.respond_batch(lines)
+        
         # Handler priority order
         handlers = [
             self._parse_help_intent,
             self._parse_add_intent,
+            self._parse_query_intent,
             self._parse_list_intent,
-            self._parse_category_intent,
             self._parse_summary_intent,
             self._parse_biggest_category_intent,
             self._parse_stats_intent,
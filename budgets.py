@@ -0,0 +1,22 @@
+from typing import List, Optional
+
+from db import ExpenseDB
+
+
+# Share of a budget at which we start warning before it is actually exceeded
+WARN_RATIO = 0.8
+
+
+def budget_warnings(db: ExpenseDB, category: str, date_iso: Optional[str] = None) -> List[str]:
+    """Warnings for the budgets of `category` in the period containing `date_iso`."""
+    warnings: List[str] = []
+    for status in db.budget_status(category=category, date_iso=date_iso):
+        limit, spent = status["limit"], status["spent"]
+        if limit <= 0:
+            continue
+        label = f"{status['category']} {status['period']}ly budget"
+        if spent > limit:
+            warnings.append(f"⚠️ {label} exceeded: ₹{spent:.2f} of ₹{limit:.2f} (over by ₹{spent - limit:.2f})")
+        elif spent >= WARN_RATIO * limit:
+            warnings.append(f"⚠️ {label} at {spent / limit * 100:.0f}%: ₹{spent:.2f} of ₹{limit:.2f}")
+    return warnings
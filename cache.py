@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from flask import Response, make_response, request, session
+
+
+class CachedPage:
+    __slots__ = ("body", "mimetype", "etag", "last_modified")
+
+    def __init__(self, body: bytes, mimetype: str) -> None:
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class PageCache:
+    """Thread-safe LRU of rendered pages bounded by the total size of their bodies."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedPage]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[CachedPage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, mimetype: str) -> CachedPage:
+        entry = CachedPage(body, mimetype)
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.body)
+            self._entries[key] = entry
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def _normalized_args() -> Tuple[Tuple[str, str], ...]:
+    # Views treat empty values as missing, so ?category=&start= shares an entry with no arguments
+    return tuple(sorted((k, v.strip()) for k, v in request.args.items(multi=True) if v.strip()))
+
+
+def cached_page(cache: PageCache, version: Callable[[], int]) -> Callable:
+    """Serve a read-only view from `cache` while the data it was rendered from is unchanged.
+
+    The key is (path, normalized query args, data version, today's date); the date is part of it
+    because "this month"/"today" pages and forecasts move on at midnight without any write.
+    Responses carry an ETag and Last-Modified so browsers can revalidate with a 304.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or session.get("_flashes"):
+                # Pending flash messages are rendered into the page and must not be replayed
+                return view(*args, **kwargs)
+
+            key = (request.path, _normalized_args(), version(), date.today().isoformat())
+            entry = cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = cache.put(key, response.get_data(), response.mimetype)
+
+            response = Response(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.last_modified = entry.last_modified
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
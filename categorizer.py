@@ -50,6 +50,17 @@ class CategoryRules:
                 best_category = category
         return best_category
 
+    def categorize_many(self, descriptions: List[str]) -> List[str]:
+        """Categorize a batch, matching each distinct description only once."""
+        seen: Dict[str, str] = {}
+        result: List[str] = []
+        for description in descriptions:
+            key = description.lower()
+            if key not in seen:
+                seen[key] = self.categorize(key)
+            result.append(seen[key])
+        return result
+
     def add_keyword(self, category: str, keyword: str) -> None:
         if category not in self._rules:
             self._rules[category] = []
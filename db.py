@@ -1,17 +1,65 @@
 import csv
+import json
 import os
 import sqlite3
+from contextlib import contextmanager
 from datetime import date, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.request import pathname2url
+
+from nlquery import GROUPINGS, METRICS
+from recurring import FREQUENCIES, occurrence_date, virtual_rows
+from tags import (
+    CHUNK_BITS,
+    Node,
+    decode_chunk,
+    encode_chunk,
+    evaluate,
+    extract_tags,
+    group_by_chunk,
+    ids_from_bitset,
+    matches,
+    parse_tag_query,
+)
 
 
 class ExpenseDB:
+    # Monday of the row's week, matching the "week" period of get_summary
+    _WEEK_KEY_SQL = "date({row}.date, '-' || ((CAST(strftime('%w', {row}.date) AS INTEGER) + 6) % 7) || ' days')"
+    # spend_counters period_key per budget period
+    _PERIOD_KEY_SQL = {"month": "substr({row}.date, 1, 7)", "week": _WEEK_KEY_SQL}
+    # Tag matches up to this many are looked up by id; larger sets are bit-tested per row
+    _TAG_ID_LIST_MAX = 2000
+
     def __init__(self, db_path: str = "expenses.db") -> None:
         self.db_path = db_path
         self._ensure_db()
 
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived connection that commits on success and is always closed.
+
+        Several processes (web workers, the CLI, imports) share one database file, so writers
+        wait up to `timeout` seconds for the lock instead of failing with "database is locked".
+        """
+        # URI mode so archives can be attached read-only (file:...?mode=ro)
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.db_path))}", timeout=30, uri=True)
+        try:
+            # Safe with WAL: a crash can lose the last commits but never corrupts the file
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
     def _ensure_db(self) -> None:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
+            # WAL lets readers in every worker proceed while one writer commits
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Workers and CLI calls can start together on an old schema. Every check-then-alter
+            # step below runs under one write lock, so exactly one process migrates and the
+            # others wait, then find each step already done.
+            conn.execute("BEGIN IMMEDIATE")
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS expenses (
@@ -23,25 +71,822 @@ class ExpenseDB:
                 );
                 """
             )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(expenses)")}
+            if "content_hash" not in columns:
+                # Imported rows carry a hash of their content so re-importing a statement is a no-op.
+                # Manually added rows leave it NULL, which the unique index ignores.
+                conn.execute("ALTER TABLE expenses ADD COLUMN content_hash TEXT")
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_content_hash ON expenses(content_hash)"
+            )
+            # data_version is bumped by triggers on every write, including writes from other
+            # processes (CLI, imports), so caches can tell when anything they rendered is stale.
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('data_version', 0)")
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS expenses_version_{event.lower()} AFTER {event} ON expenses
+                    BEGIN
+                        UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+                    END;
+                    """
+                )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS forecast_state (series TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+            self._ensure_budget_tables(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)")
+            # Covers category questions ("food over the last 3 months"): one range scan per
+            # category, never touching the table itself
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses(category COLLATE NOCASE, date, amount)"
+            )
+            self._ensure_tag_tables(conn)
+            self._ensure_archive_tables(conn)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS recurring (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    description TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    category TEXT NOT NULL,
+                    frequency TEXT NOT NULL,
+                    interval INTEGER NOT NULL DEFAULT 1,
+                    start_date TEXT NOT NULL,
+                    end_date TEXT,
+                    next_index INTEGER NOT NULL DEFAULT 0,
+                    next_due TEXT NOT NULL
+                );
+                """
+            )
+            # Only rules with occurrences not yet written out are read by queries, via this index
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_recurring_next_due ON recurring(next_due)")
+            # Pending occurrences show up in listings and totals, so rule changes are data changes
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS recurring_version_{event.lower()} AFTER {event} ON recurring
+                    BEGIN
+                        UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+                    END;
+                    """
+                )
             conn.commit()
 
+    def _ensure_budget_tables(self, conn: sqlite3.Connection) -> None:
+        """Budgets plus running spend per (category, period, period key).
+
+        Triggers keep spend_counters in step with every insert, edit and delete in the same
+        transaction as the write itself, so a budget check is a single primary-key lookup
+        instead of a SUM over the period.
+        """
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS budgets (
+                category TEXT NOT NULL COLLATE NOCASE,
+                period TEXT NOT NULL CHECK (period IN ('week', 'month')),
+                limit_amount REAL NOT NULL,
+                PRIMARY KEY (category, period)
+            );
+            """
+        )
+        has_counters = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'spend_counters'"
+        ).fetchone()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS spend_counters (
+                category TEXT NOT NULL COLLATE NOCASE,
+                period TEXT NOT NULL,
+                period_key TEXT NOT NULL,
+                total REAL NOT NULL,
+                PRIMARY KEY (category, period, period_key)
+            ) WITHOUT ROWID;
+            """
+        )
+        for period, key_sql in self._PERIOD_KEY_SQL.items():
+            new_key, old_key = key_sql.format(row="NEW"), key_sql.format(row="OLD")
+            add = f"""
+                INSERT INTO spend_counters(category, period, period_key, total)
+                VALUES (NEW.category, '{period}', {new_key}, NEW.amount)
+                ON CONFLICT(category, period, period_key) DO UPDATE SET total = total + excluded.total;
+            """
+            remove = f"""
+                UPDATE spend_counters SET total = total - OLD.amount
+                WHERE category = OLD.category AND period = '{period}' AND period_key = {old_key};
+            """
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS spend_{period}_insert AFTER INSERT ON expenses BEGIN {add} END;")
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS spend_{period}_delete AFTER DELETE ON expenses BEGIN {remove} END;")
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS spend_{period}_update AFTER UPDATE OF date, amount, category ON expenses "
+                f"BEGIN {remove} {add} END;"
+            )
+            if not has_counters:
+                # First run on an existing database: backfill from history once
+                row_key = key_sql.format(row="expenses")
+                conn.execute(
+                    f"""
+                    INSERT INTO spend_counters(category, period, period_key, total)
+                    SELECT category, '{period}', {row_key}, SUM(amount) FROM expenses
+                    GROUP BY category COLLATE NOCASE, {row_key}
+                    """
+                )
+
+    def _ensure_tag_tables(self, conn: sqlite3.Connection) -> None:
+        """Many-to-many tags plus a compressed bitmap of expense ids per tag.
+
+        expense_tags is the source of truth; tag_bitmaps holds the same membership as zlib-
+        compressed bitsets in 65536-id chunks so AND/OR/NOT filters are integer bit operations.
+        """
+        has_tags = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tags'").fetchone()
+        conn.execute("CREATE TABLE IF NOT EXISTS tags (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE COLLATE NOCASE)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS expense_tags (
+                expense_id INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                PRIMARY KEY (expense_id, tag_id)
+            ) WITHOUT ROWID;
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tag_bitmaps (
+                tag_id INTEGER NOT NULL,
+                chunk INTEGER NOT NULL,
+                bits BLOB NOT NULL,
+                PRIMARY KEY (tag_id, chunk)
+            ) WITHOUT ROWID;
+            """
+        )
+        if not has_tags:
+            # First run on an existing database: tag the history in batches
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    "SELECT id, description, category FROM expenses WHERE id > ? ORDER BY id LIMIT 10000", (last_id,)
+                ).fetchall()
+                if not rows:
+                    break
+                self._index_tags(conn, rows)
+                last_id = rows[-1][0]
+
+    def _ensure_archive_tables(self, conn: sqlite3.Connection) -> None:
+        """Registry of archived years plus their per-month/category totals.
+
+        An archived year lives in its own database file (see archive_year). The totals stay in
+        the hot database so all-time summaries and monthly series never have to open it.
+        """
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archives (
+                year INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                total REAL NOT NULL
+            );
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archive_totals (
+                ym TEXT NOT NULL,
+                category TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (ym, category)
+            ) WITHOUT ROWID;
+            """
+        )
+        # Archived years are closed: rows for them from any writer (imports, other processes)
+        # are dropped, and edits cannot move an expense into one.
+        archived = "EXISTS (SELECT 1 FROM archives WHERE year = CAST(substr(NEW.date, 1, 4) AS INTEGER))"
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS expenses_archived_insert BEFORE INSERT ON expenses "
+            f"WHEN {archived} BEGIN SELECT RAISE(IGNORE); END;"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS expenses_archived_update BEFORE UPDATE OF date ON expenses "
+            f"WHEN {archived} BEGIN SELECT RAISE(ABORT, 'year is archived'); END;"
+        )
+
+    def _index_tags(self, conn: sqlite3.Connection, rows: List[Tuple[int, str, str]]) -> None:
+        """Extract and store tags for (id, description, category) rows, updating the bitmaps."""
+        # Imports and generated data repeat the same merchants, so extract once per distinct text
+        extracted: Dict[Tuple[str, str], List[str]] = {}
+        tagged: List[Tuple[int, List[str]]] = []
+        for expense_id, description, category in rows:
+            key = (description, category)
+            if key not in extracted:
+                extracted[key] = extract_tags(description, category)
+            tagged.append((expense_id, extracted[key]))
+        tag_ids = self._tag_ids(conn, [name for _, names in tagged for name in names])
+        if not tag_ids:
+            return
+        pairs = [(tag_ids[name], expense_id) for expense_id, names in tagged for name in names]
+        conn.executemany("INSERT OR IGNORE INTO expense_tags(tag_id, expense_id) VALUES(?, ?)", pairs)
+        self._update_bitmaps(conn, group_by_chunk(pairs), set_bits=True)
+
+    def _tag_ids(self, conn: sqlite3.Connection, names: Iterable[str]) -> Dict[str, int]:
+        """{lower-cased name: tag id} for `names`, creating the tags that do not exist yet."""
+        names = sorted(set(names))
+        conn.executemany("INSERT OR IGNORE INTO tags(name) VALUES(?)", [(name,) for name in names])
+        tag_ids: Dict[str, int] = {}
+        for start in range(0, len(names), 500):
+            batch = names[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for tag_id, name in conn.execute(f"SELECT id, name FROM tags WHERE name IN ({placeholders})", batch):
+                tag_ids[name.lower()] = tag_id
+        return tag_ids
+
+    def _bulk_index_tags(self, conn: sqlite3.Connection, after_id: int) -> None:
+        """Tag every row with id > after_id in one set-based pass (used by bulk_load).
+
+        Tags depend only on (description, category), so they are extracted once per distinct
+        pair; expense_tags is then filled by a single INSERT ... SELECT joining the new rows to
+        those pairs, and each pair's ids are turned into bitmap chunks once and OR-ed into the
+        chunks of its tags.
+        """
+        keys = conn.execute("SELECT DISTINCT description, category FROM expenses WHERE id > ?", (after_id,)).fetchall()
+        extracted = [extract_tags(description, category) for description, category in keys]
+        tag_ids = self._tag_ids(conn, [name for names in extracted for name in names])
+        if not tag_ids:
+            return
+        conn.execute(
+            "CREATE TEMP TABLE bulk_keys (key INTEGER PRIMARY KEY, description TEXT, category TEXT, UNIQUE (description, category))"
+        )
+        conn.execute("CREATE TEMP TABLE bulk_key_tags (key INTEGER, tag_id INTEGER, PRIMARY KEY (key, tag_id)) WITHOUT ROWID")
+        try:
+            conn.executemany("INSERT INTO temp.bulk_keys VALUES(?, ?, ?)", [(key, *text) for key, text in enumerate(keys)])
+            conn.executemany(
+                "INSERT OR IGNORE INTO temp.bulk_key_tags VALUES(?, ?)",
+                [(key, tag_ids[name]) for key, names in enumerate(extracted) for name in names],
+            )
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO expense_tags(expense_id, tag_id)
+                SELECT e.id, t.tag_id FROM expenses e
+                JOIN temp.bulk_keys k ON k.description = e.description AND k.category = e.category
+                JOIN temp.bulk_key_tags t ON t.key = k.key
+                WHERE e.id > ?
+                """,
+                (after_id,),
+            )
+            key_ids = conn.execute(
+                """
+                SELECT k.key, e.id FROM expenses e
+                JOIN temp.bulk_keys k ON k.description = e.description AND k.category = e.category
+                WHERE e.id > ?
+                """,
+                (after_id,),
+            )
+            changes: Dict[Tuple[int, int], int] = {}
+            for (key, chunk), bits in group_by_chunk(key_ids).items():
+                for tag_id in {tag_ids[name] for name in extracted[key]}:
+                    changes[(tag_id, chunk)] = changes.get((tag_id, chunk), 0) | bits
+            self._update_bitmaps(conn, changes, set_bits=True)
+        finally:
+            conn.execute("DROP TABLE temp.bulk_keys")
+            conn.execute("DROP TABLE temp.bulk_key_tags")
+
+    def _unindex_tags(self, conn: sqlite3.Connection, expense_ids: List[int]) -> None:
+        placeholders = ",".join("?" * len(expense_ids))
+        pairs = conn.execute(
+            f"SELECT tag_id, expense_id FROM expense_tags WHERE expense_id IN ({placeholders})", expense_ids
+        ).fetchall()
+        conn.execute(f"DELETE FROM expense_tags WHERE expense_id IN ({placeholders})", expense_ids)
+        self._update_bitmaps(conn, group_by_chunk(pairs), set_bits=False)
+
+    def _update_bitmaps(self, conn: sqlite3.Connection, changes: Dict[Tuple[int, int], int], set_bits: bool) -> None:
+        for (tag_id, chunk), bits in changes.items():
+            row = conn.execute("SELECT bits FROM tag_bitmaps WHERE tag_id = ? AND chunk = ?", (tag_id, chunk)).fetchone()
+            current = decode_chunk(row[0]) if row else 0
+            updated = current | bits if set_bits else current & ~bits
+            if updated:
+                conn.execute(
+                    "INSERT OR REPLACE INTO tag_bitmaps(tag_id, chunk, bits) VALUES(?, ?, ?)",
+                    (tag_id, chunk, encode_chunk(updated)),
+                )
+            elif row:
+                conn.execute("DELETE FROM tag_bitmaps WHERE tag_id = ? AND chunk = ?", (tag_id, chunk))
+
+    def _tag_bitset(self, conn: sqlite3.Connection, name: str) -> int:
+        bits = 0
+        for chunk, blob in conn.execute(
+            "SELECT b.chunk, b.bits FROM tag_bitmaps b JOIN tags t ON t.id = b.tag_id WHERE t.name = ?", (name,)
+        ):
+            bits |= decode_chunk(blob) << (chunk * CHUNK_BITS)
+        return bits
+
+    def _tag_filter(self, conn: sqlite3.Connection, node: Node, candidates: Optional[int] = None) -> Tuple[str, List]:
+        """SQL condition (and its parameters) restricting `id` to a parsed tag query.
+
+        The query is evaluated once to a bitset. A small match set (or one smaller than the
+        `candidates` rows the other conditions leave) is passed as an id list and looked up
+        by rowid; otherwise the condition is a tag_match(id) bit test on this connection, so
+        the date and category conditions narrow the rows first and only the survivors are
+        tested, one byte lookup each.
+        """
+        # Highest id ever handed out, so ids of archived rows are part of the NOT universe too
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'expenses'").fetchone()
+        max_id = row[0] if row else 0
+        bits = evaluate(node, lambda name: self._tag_bitset(conn, name), lambda: (1 << (max_id + 1)) - 2)
+        matched = bin(bits).count("1")
+        if matched <= self._TAG_ID_LIST_MAX or (candidates is not None and matched < candidates):
+            return "id IN (SELECT value FROM json_each(?))", [json.dumps(ids_from_bitset(bits))]
+        bitmap = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+        def tag_match(expense_id: int) -> int:
+            index = expense_id >> 3
+            return (bitmap[index] >> (expense_id & 7)) & 1 if index < len(bitmap) else 0
+
+        conn.create_function("tag_match", 1, tag_match, deterministic=True)
+        return "tag_match(id)", []
+
+    def list_tags(self, limit: int = 50) -> List[Dict]:
+        """Most used tags with their expense counts."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                """
+                SELECT t.name, COUNT(*) AS count FROM expense_tags et JOIN tags t ON t.id = et.tag_id
+                GROUP BY t.id ORDER BY count DESC, t.name LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def data_version(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return int(row[0]) if row else 0
+
+    @staticmethod
+    def _check_date(date_iso: str) -> None:
+        # Period keys and budget windows are derived from the stored text, so only real
+        # calendar dates in YYYY-MM-DD form may be written (not 2025-02-30 or 20250101)
+        try:
+            valid = date.fromisoformat(date_iso).isoformat() == date_iso
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ValueError(f"Invalid date '{date_iso}', expected YYYY-MM-DD")
+
+    def _check_writable(self, conn: sqlite3.Connection, date_iso: str) -> None:
+        self._check_date(date_iso)
+        if conn.execute("SELECT 1 FROM archives WHERE year = ?", (int(date_iso[:4]),)).fetchone():
+            raise ValueError(f"{date_iso[:4]} is archived and read-only")
+
     def add_expense(self, date_iso: str, amount: float, description: str, category: str) -> int:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
+            self._check_writable(conn, date_iso)
             cursor = conn.execute(
                 "INSERT INTO expenses(date, amount, description, category) VALUES(?, ?, ?, ?)",
                 (date_iso, amount, description, category),
             )
+            expense_id = int(cursor.lastrowid)
+            self._index_tags(conn, [(expense_id, description, category)])
+            conn.commit()
+            return expense_id
+
+    def add_expenses_bulk(self, rows: Iterable[Tuple[str, float, str, str, Optional[str]]]) -> int:
+        """Insert (date, amount, description, category, content_hash) rows in one transaction.
+
+        Rows whose content_hash already exists are skipped. Returns the number of rows inserted.
+        """
+        with self._connect() as conn:
+            inserted = self._insert_rows(conn, rows)
+            conn.commit()
+            return inserted
+
+    def _insert_rows(self, conn: sqlite3.Connection, rows: Iterable[Tuple[str, float, str, str, Optional[str]]]) -> int:
+        """INSERT OR IGNORE rows and tag the new ones, inside the caller's transaction."""
+        rows = list(rows)
+        for row in rows:
+            self._check_date(row[0])
+        if not conn.in_transaction:
+            # Take the write lock first so the id range read below covers exactly our rows
+            conn.execute("BEGIN IMMEDIATE")
+        before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0]
+        # rowcount, unlike total_changes, does not count rows touched by triggers
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO expenses(date, amount, description, category, content_hash) VALUES(?, ?, ?, ?, ?)",
+            rows,
+        )
+        inserted = max(0, cursor.rowcount)
+        if inserted:
+            self._index_tags(
+                conn, conn.execute("SELECT id, description, category FROM expenses WHERE id > ?", (before,)).fetchall()
+            )
+        return inserted
+
+    def bulk_load(
+        self,
+        batches: Iterable[List[Tuple[str, float, str, str, Optional[str]]]],
+        expected_rows: int = 0,
+        hashed: bool = True,
+    ) -> int:
+        """Append batches of (date, amount, description, category, content_hash) rows in one transaction.
+
+        For statement imports, generated datasets and other large loads. The per-row insert
+        triggers are suspended while rows stream in; each batch updates the spend counters of
+        its id range with one GROUP BY, the new rows are tagged in a single set-based pass at
+        the end and data_version is bumped once. When `expected_rows` is at least the size of
+        the table, the date and category indexes are dropped too and rebuilt by one sort after
+        the load, which is much cheaper than updating them row by row. Rows whose content_hash
+        already exists are skipped, as in add_expenses_bulk; callers whose rows carry no hash
+        (generated data) pass hashed=False so the content hash index is rebuilt like the others.
+        DDL is transactional in SQLite, so other connections see all of it or none. Returns
+        the number of rows inserted.
+        """
+        inserted = 0
+        with self._connect() as conn:
+            # Index pages of a large load stay in memory instead of being re-read per batch
+            conn.execute("PRAGMA cache_size = -262144")
+            conn.execute("BEGIN IMMEDIATE")
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0]
+            suspended = ["expenses_version_insert", "spend_month_insert", "spend_week_insert"]
+            if expected_rows >= first_id:
+                suspended += ["idx_expenses_date", "idx_expenses_category_date"]
+                if not hashed:
+                    # Otherwise it stays: it is what skips already-imported rows
+                    suspended.append("idx_expenses_content_hash")
+            saved = conn.execute(
+                f"SELECT type, name, sql FROM sqlite_master WHERE name IN ({','.join('?' * len(suspended))})", suspended
+            ).fetchall()
+            for kind, name, _ in saved:
+                conn.execute(f"DROP {kind.upper()} {name}")
+            before = first_id
+            for batch in batches:
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO expenses(date, amount, description, category, content_hash) VALUES(?, ?, ?, ?, ?)",
+                    batch,
+                )
+                inserted += max(0, cursor.rowcount)
+                last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()[0]
+                if last_id == before:
+                    continue
+                for period, key_sql in self._PERIOD_KEY_SQL.items():
+                    row_key = key_sql.format(row="expenses")
+                    conn.execute(
+                        f"""
+                        INSERT INTO spend_counters(category, period, period_key, total)
+                        SELECT category, '{period}', {row_key}, SUM(amount) FROM expenses WHERE id > ?
+                        GROUP BY category COLLATE NOCASE, {row_key}
+                        ON CONFLICT(category, period, period_key) DO UPDATE SET total = total + excluded.total
+                        """,
+                        (before,),
+                    )
+                before = last_id
+            if inserted:
+                self._bulk_index_tags(conn, first_id)
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+            for _, _, sql in saved:
+                conn.execute(sql)
+            conn.commit()
+        return inserted
+
+    def update_expense(self, expense_id: int, date_iso: str, amount: float, description: str, category: str) -> bool:
+        with self._connect() as conn:
+            self._check_writable(conn, date_iso)
+            cursor = conn.execute(
+                "UPDATE expenses SET date = ?, amount = ?, description = ?, category = ? WHERE id = ?",
+                (date_iso, amount, description, category, expense_id),
+            )
+            if cursor.rowcount > 0:
+                self._unindex_tags(conn, [expense_id])
+                self._index_tags(conn, [(expense_id, description, category)])
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def delete_expense(self, expense_id: int) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+            if cursor.rowcount > 0:
+                self._unindex_tags(conn, [expense_id])
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def set_budget(self, category: str, period: str, limit_amount: float) -> None:
+        if period not in {"week", "month"}:
+            raise ValueError("Invalid period")
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO budgets(category, period, limit_amount) VALUES(?, ?, ?)
+                ON CONFLICT(category, period) DO UPDATE SET limit_amount = excluded.limit_amount
+                """,
+                (category, period, limit_amount),
+            )
+            conn.commit()
+
+    def remove_budget(self, category: str, period: str) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM budgets WHERE category = ? AND period = ?", (category, period))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def _period_keys(self, date_iso: str) -> Tuple[str, str]:
+        day = date.fromisoformat(date_iso)
+        return day.isoformat()[:7], (day - timedelta(days=day.weekday())).isoformat()
+
+    def budget_status(self, category: Optional[str] = None, date_iso: Optional[str] = None) -> List[Dict]:
+        """Budgets with the spend of the period containing `date_iso` (default today).
+
+        Reads only the budgets and their counter rows, never the expenses table.
+        """
+        month_key, week_key = self._period_keys(date_iso or date.today().isoformat())
+        query = """
+            SELECT b.category, b.period, b.limit_amount, COALESCE(c.total, 0) AS spent
+            FROM budgets b
+            LEFT JOIN spend_counters c
+              ON c.category = b.category AND c.period = b.period
+             AND c.period_key = CASE b.period WHEN 'month' THEN ? ELSE ? END
+        """
+        params: List = [month_key, week_key]
+        if category:
+            query += " WHERE b.category = ?"
+            params.append(category)
+        query += " ORDER BY b.category, b.period"
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                "category": row["category"],
+                "period": row["period"],
+                "limit": float(row["limit_amount"]),
+                "spent": float(row["spent"]),
+                "remaining": float(row["limit_amount"]) - float(row["spent"]),
+            }
+            for row in rows
+        ]
+
+    def add_recurring(
+        self,
+        description: str,
+        amount: float,
+        category: str,
+        frequency: str,
+        start_date: str,
+        interval: int = 1,
+        end_date: Optional[str] = None,
+    ) -> int:
+        if frequency not in FREQUENCIES:
+            raise ValueError("Invalid frequency")
+        # Occurrence dates are computed from these on every listing, so a bad one would break them all
+        self._check_date(start_date)
+        if end_date is not None:
+            self._check_date(end_date)
+            if end_date < start_date:
+                raise ValueError("The end date is before the start date")
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO recurring(description, amount, category, frequency, interval, start_date, end_date, next_index, next_due)
+                VALUES(?, ?, ?, ?, ?, ?, ?, 0, ?)
+                """,
+                (description, amount, category, frequency, max(1, interval), start_date, end_date, start_date),
+            )
             conn.commit()
             return int(cursor.lastrowid)
 
+    def list_recurring(self, active_only: bool = False) -> List[Dict]:
+        """All recurring rules, or with `active_only` just those with occurrences still to come."""
+        query = "SELECT * FROM recurring"
+        if active_only:
+            query += " WHERE end_date IS NULL OR next_due <= end_date"
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(query + " ORDER BY next_due, id").fetchall()
+        return [dict(row) for row in rows]
+
+    def get_recurring(self, rule_id: int) -> Optional[Dict]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM recurring WHERE id = ?", (rule_id,)).fetchone()
+        return dict(row) if row else None
+
+    def remove_recurring(self, rule_id: int) -> bool:
+        """Stop a rule. Occurrences already written out stay as normal expenses."""
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM recurring WHERE id = ?", (rule_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def materialize_recurring(self, rule: Dict, due: List[Tuple[int, date]]) -> int:
+        """Write the given (index, date) occurrences of `rule` as real expenses and advance it.
+
+        Both happen in one transaction; the per-occurrence content hash makes a concurrent
+        materialization of the same occurrence by another process a no-op.
+        """
+        if not due:
+            return 0
+        last_index = due[-1][0]
+        next_due = occurrence_date(rule, last_index + 1).isoformat()
+        rows = [
+            (day.isoformat(), rule["amount"], rule["description"], rule["category"], f"recurring:{rule['id']}:{n}")
+            for n, day in due
+        ]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE recurring SET next_index = ?, next_due = ? WHERE id = ? AND next_index <= ?",
+                (last_index + 1, next_due, rule["id"], last_index),
+            )
+            inserted = self._insert_rows(conn, rows)
+            conn.commit()
+            return inserted
+
+    def _pending_recurring(self, conn: sqlite3.Connection, start_date: Optional[str], end_date: str) -> List[Dict]:
+        """Rules that still have unwritten occurrences on or before end_date."""
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT * FROM recurring WHERE next_due <= ? AND (end_date IS NULL OR end_date >= ?)",
+            (end_date, start_date or "0001-01-01"),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _scheduled_horizon(self, end_date: str) -> str:
+        """Clamp how far ahead pending recurring occurrences are generated (one year)."""
+        return min(end_date, (date.today() + timedelta(days=366)).isoformat())
+
+    def scheduled_expenses(self, start_date: Optional[str], end_date: str) -> List[Dict]:
+        """Recurring occurrences in the range that are not real rows yet (e.g. future rent)."""
+        end_date = self._scheduled_horizon(end_date)
+        with self._connect() as conn:
+            return virtual_rows(self._pending_recurring(conn, start_date, end_date), start_date, end_date)
+
+    def archive_year(self, year: int, directory: Optional[str] = None, vacuum: bool = True) -> Dict:
+        """Move every expense of a closed `year` out of the hot database into its own file.
+
+        The archive is a self-contained SQLite database (expenses with their original ids,
+        hashes and tags) written to `directory` (default: "archive" next to the hot database).
+        Per-month/category totals stay behind in archive_totals, the tag bitmaps keep the
+        archived ids, and the year becomes read-only. With `vacuum` the hot file is compacted
+        afterwards so it actually shrinks on disk.
+        """
+        if year >= date.today().year:
+            raise ValueError("Only years before the current one can be archived")
+        base_dir = os.path.dirname(os.path.abspath(self.db_path))
+        directory = os.path.abspath(directory or os.path.join(base_dir, "archive"))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"expenses_{year:04d}.db")
+        start, end = f"{year:04d}-01-01", f"{year:04d}-12-31"
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM archives WHERE year = ?", (year,)).fetchone():
+                raise ValueError(f"{year} is already archived")
+            if os.path.exists(path):
+                # Left behind by an interrupted run; it was never registered
+                os.remove(path)
+            conn.execute("ATTACH DATABASE ? AS cold", (path,))
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    """
+                    CREATE TABLE cold.expenses (
+                        id INTEGER PRIMARY KEY,
+                        date TEXT NOT NULL,
+                        amount REAL NOT NULL,
+                        description TEXT NOT NULL,
+                        category TEXT NOT NULL,
+                        content_hash TEXT
+                    );
+                    """
+                )
+                conn.execute(
+                    """
+                    INSERT INTO cold.expenses
+                    SELECT id, date, amount, description, category, content_hash FROM main.expenses
+                    WHERE date BETWEEN ? AND ? ORDER BY date, id
+                    """,
+                    (start, end),
+                )
+                conn.execute("CREATE INDEX cold.idx_expenses_date ON expenses(date)")
+                # Tags by name so the file stands on its own
+                conn.execute(
+                    """
+                    CREATE TABLE cold.expense_tags (
+                        expense_id INTEGER NOT NULL,
+                        tag TEXT NOT NULL,
+                        PRIMARY KEY (expense_id, tag)
+                    ) WITHOUT ROWID;
+                    """
+                )
+                conn.execute(
+                    """
+                    INSERT INTO cold.expense_tags
+                    SELECT et.expense_id, t.name FROM main.expense_tags et JOIN main.tags t ON t.id = et.tag_id
+                    WHERE et.expense_id IN (SELECT id FROM cold.expenses)
+                    """
+                )
+                conn.execute(
+                    """
+                    INSERT INTO main.archive_totals(ym, category, total, count)
+                    SELECT substr(date, 1, 7), category, SUM(amount), COUNT(*) FROM cold.expenses
+                    GROUP BY substr(date, 1, 7), category
+                    """
+                )
+                row_count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM cold.expenses").fetchone()
+                conn.execute("DELETE FROM main.expense_tags WHERE expense_id IN (SELECT id FROM cold.expenses)")
+                conn.execute("DELETE FROM main.expenses WHERE date BETWEEN ? AND ?", (start, end))
+                # The delete triggers zeroed the year's spend counters; weeks straddling New Year keep the rest
+                conn.execute(
+                    "DELETE FROM spend_counters WHERE period_key >= ? AND period_key < ? AND ABS(total) < 0.005",
+                    (f"{year:04d}", f"{year + 1:04d}"),
+                )
+                try:
+                    stored = os.path.relpath(path, base_dir)
+                except ValueError:
+                    # Different drive on Windows
+                    stored = path
+                conn.execute(
+                    "INSERT INTO archives(year, path, row_count, total) VALUES(?, ?, ?, ?)",
+                    (year, stored, row_count, total),
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute("DETACH DATABASE cold")
+        if vacuum:
+            with self._connect() as conn:
+                conn.execute("VACUUM")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"year": year, "path": path, "row_count": int(row_count), "total": float(total)}
+
+    def hot_years(self) -> List[int]:
+        """Years that still have expenses in the hot database."""
+        years: List[int] = []
+        with self._connect() as conn:
+            # Skip-scan the date index one year at a time instead of reading every row
+            row = conn.execute("SELECT MIN(date) FROM expenses").fetchone()
+            while row and row[0]:
+                year = int(row[0][:4])
+                years.append(year)
+                row = conn.execute("SELECT MIN(date) FROM expenses WHERE date >= ?", (f"{year + 1:04d}",)).fetchone()
+        return years
+
+    def list_archives(self) -> List[Dict]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT year, path, row_count, total FROM archives ORDER BY year").fetchall()
+        archives = []
+        for row in rows:
+            path = self._archive_path(row["path"])
+            archives.append(
+                {
+                    "year": row["year"],
+                    "path": path,
+                    "row_count": row["row_count"],
+                    "total": float(row["total"]),
+                    "size": os.path.getsize(path) if os.path.exists(path) else None,
+                }
+            )
+        return archives
+
+    def _archive_path(self, stored: str) -> str:
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), stored)
+
+    def _archives_in(self, conn: sqlite3.Connection, start_date: Optional[str], end_date: Optional[str]) -> List[Tuple[int, str]]:
+        """(year, path) of archived years overlapping [start_date, end_date], newest first.
+
+        This is the query planner's only look at archives: a range inside non-archived years
+        gets an empty list and never opens an archive file.
+        """
+        first = int(start_date[:4]) if start_date else 0
+        last = int(end_date[:4]) if end_date else 9999
+        rows = conn.execute(
+            "SELECT year, path FROM archives WHERE year BETWEEN ? AND ? ORDER BY year DESC", (first, last)
+        ).fetchall()
+        return [(year, self._archive_path(path)) for year, path in rows]
+
+    @contextmanager
+    def _attached(self, conn: sqlite3.Connection, path: str) -> Iterator[None]:
+        """Attach one archive read-only as schema "cold" for the duration of the block."""
+        conn.execute("ATTACH DATABASE ? AS cold", (f"file:{pathname2url(path)}?mode=ro",))
+        try:
+            yield
+        finally:
+            conn.execute("DETACH DATABASE cold")
+
     def list_expenses(
         self,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         category: Optional[str] = None,
         limit: int = 50,
+        tags: Optional[str] = None,
     ) -> List[Dict]:
-        query = "SELECT id, date, amount, description, category FROM expenses"
+        """Newest expenses matching the filters.
+
+        `tags` is a tag query such as "food AND NOT travel" (see tags.parse_tag_query); it is
+        resolved against the bitmap index and the matching ids restrict the SQL query.
+        """
+        tag_query = parse_tag_query(tags) if tags else None
+        query = "SELECT id, date, amount, description, category FROM {table}"
         clauses: List[str] = []
         params: List = []
         if start_date:
@@ -53,15 +898,51 @@ class ExpenseDB:
         if category:
             clauses.append("LOWER(category) = LOWER(?)")
             params.append(category)
-        if clauses:
-            query += " WHERE " + " AND ".join(clauses)
-        query += " ORDER BY date DESC, id DESC LIMIT ?"
-        params.append(limit)
+        with self._connect() as conn:
+            if tag_query is not None:
+                clause, clause_params = self._tag_filter(conn, tag_query)
+                clauses.append(clause)
+                params.extend(clause_params)
+            if clauses:
+                query += " WHERE " + " AND ".join(clauses)
+            query += " ORDER BY date DESC, id DESC LIMIT ?"
+            params.append(limit)
 
-        with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            rows = conn.execute(query, params).fetchall()
-            return [dict(row) for row in rows]
+            rows = [dict(row) for row in conn.execute(query.format(table="main.expenses"), params).fetchall()]
+            for year, path in self._archives_in(conn, start_date, end_date):
+                # Archives are visited newest first and hold one year each, so once `limit`
+                # rows newer than this year are in hand no older archive can contribute
+                if len(rows) >= limit and rows[limit - 1]["date"] > f"{year:04d}-12-31":
+                    break
+                with self._attached(conn, path):
+                    rows.extend(dict(row) for row in conn.execute(query.format(table="cold.expenses"), params).fetchall())
+                rows = sorted(rows, key=lambda r: (r["date"], r["id"]), reverse=True)[:limit]
+            # Recurring occurrences that have not been written out yet appear alongside real rows
+            scheduled_end = self._scheduled_horizon(end_date or date.today().isoformat())
+            scheduled = virtual_rows(self._pending_recurring(conn, start_date, scheduled_end), start_date, scheduled_end)
+        if category:
+            scheduled = [row for row in scheduled if row["category"].lower() == category.lower()]
+        if tag_query is not None:
+            scheduled = [row for row in scheduled if matches(tag_query, extract_tags(row["description"], row["category"]))]
+        if scheduled:
+            rows = sorted(rows + scheduled, key=lambda r: (r["date"], r["id"] or 0), reverse=True)[:limit]
+        return rows
+
+    def max_expense_id(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM expenses").fetchone()
+        return int(row[0])
+
+    def expenses_since(self, after_id: int, limit: int = 20) -> List[Dict]:
+        """Newest rows with id > after_id (at most `limit`, newest first)."""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT id, date, amount, description, category FROM expenses WHERE id > ? ORDER BY id DESC LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
 
     def _date_range_for_period(self, period: str) -> (str, str):
         today = date.today()
@@ -77,59 +958,210 @@ class ExpenseDB:
             raise ValueError("Invalid period")
         return (start.isoformat(), today.isoformat())
 
-    def get_summary(self, period: str) -> Dict:
+    def get_summary(self, period: str, tags: Optional[str] = None) -> Dict:
         start_date, end_date = self._date_range_for_period(period)
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            total_row = conn.execute(
-                "SELECT COALESCE(SUM(amount), 0) AS total FROM expenses WHERE date BETWEEN ? AND ?",
-                (start_date, end_date),
-            ).fetchone()
-            by_category_rows = conn.execute(
-                "SELECT category, COALESCE(SUM(amount), 0) AS total FROM expenses WHERE date BETWEEN ? AND ? GROUP BY category",
-                (start_date, end_date),
-            ).fetchall()
-        by_category = {row["category"]: float(row["total"]) for row in by_category_rows}
-        return {"total": float(total_row["total"]), "by_category": by_category}
+        tag_query = parse_tag_query(tags) if tags else None
+        where = "date BETWEEN ? AND ?"
+        params: List = [start_date, end_date]
+        by_category: Dict[str, float] = {}
+        with self._connect() as conn:
+            if tag_query is not None:
+                # Unlike a listing this reads every row in range, so let their count pick the strategy
+                candidates = conn.execute(f"SELECT COUNT(*) FROM expenses WHERE {where}", params).fetchone()[0]
+                clause, clause_params = self._tag_filter(conn, tag_query, candidates)
+                where += f" AND {clause}"
+                params.extend(clause_params)
+            query = f"SELECT category, SUM(amount) FROM {{table}} WHERE {where} GROUP BY category"
+            sources = [conn.execute(query.format(table="main.expenses"), params).fetchall()]
+            for year, path in self._archives_in(conn, start_date, end_date):
+                if tag_query is None and start_date <= f"{year:04d}-01-01" and end_date >= f"{year:04d}-12-31":
+                    # Whole year requested: its precomputed totals answer without opening the file
+                    sources.append(
+                        conn.execute(
+                            "SELECT category, SUM(total) FROM archive_totals WHERE ym BETWEEN ? AND ? GROUP BY category",
+                            (f"{year:04d}-01", f"{year:04d}-12"),
+                        ).fetchall()
+                    )
+                else:
+                    with self._attached(conn, path):
+                        sources.append(conn.execute(query.format(table="cold.expenses"), params).fetchall())
+            # Summaries cover spending so far; "all" must not expand open-ended rules to year 9999
+            scheduled_end = min(end_date, date.today().isoformat())
+            scheduled = virtual_rows(self._pending_recurring(conn, start_date, scheduled_end), start_date, scheduled_end)
+        if tag_query is not None:
+            scheduled = [row for row in scheduled if matches(tag_query, extract_tags(row["description"], row["category"]))]
+        for rows in sources:
+            for category, amount in rows:
+                by_category[category] = by_category.get(category, 0.0) + float(amount)
+        for row in scheduled:
+            by_category[row["category"]] = by_category.get(row["category"], 0.0) + row["amount"]
+        return {"total": sum(by_category.values()), "by_category": by_category}
 
-    def monthly_totals(self) -> Dict[str, float]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            rows = conn.execute(
-                """
-                SELECT substr(date, 1, 7) AS ym, SUM(amount) AS total
-                FROM expenses
-                GROUP BY ym
-                ORDER BY ym
-                """
-            ).fetchall()
-        return {row["ym"]: float(row["total"]) for row in rows}
+    def aggregate(
+        self,
+        metric: str = "sum",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+    ) -> List[Dict]:
+        """Answer one query AST (see nlquery.parse_question) with a single aggregate per source.
+
+        Returns [{"bucket", "category", "value", "count"}] ordered by bucket and category.
+        `bucket` is the day, week (Monday) or month for time groupings and None otherwise;
+        `category` is set when categories were asked for or group_by is "category". Only the
+        requested categories and dates are read: with categories the (category, date, amount)
+        index answers without touching the table. Whole archived years come from
+        archive_totals unless the metric needs single amounts (min/max) or days/weeks.
+        """
+        if metric not in METRICS or (group_by is not None and group_by not in GROUPINGS):
+            raise ValueError("Invalid metric or grouping")
+        buckets = {
+            "day": "e.date",
+            "week": self._WEEK_KEY_SQL.format(row="e"),
+            "month": "substr(e.date, 1, 7)",
+        }
+        bucket_sql = buckets.get(group_by, "NULL")
+        split = bool(categories) or group_by == "category"
+        clauses: List[str] = []
+        params: List = []
+        if start_date:
+            clauses.append("e.date >= ?")
+            params.append(start_date)
+        if end_date:
+            clauses.append("e.date <= ?")
+            params.append(end_date)
+        if categories:
+            clauses.append(f"e.category COLLATE NOCASE IN ({','.join('?' * len(categories))})")
+            params.extend(categories)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        query = (
+            f"SELECT {bucket_sql}, {'e.category' if split else 'NULL'}, SUM(e.amount), COUNT(*), MIN(e.amount), MAX(e.amount) "
+            f"FROM {{table}} AS e{where} GROUP BY 1, 2"
+        )
+        use_totals = metric in {"sum", "count", "avg"} and group_by in {None, "month", "category"}
+        with self._connect() as conn:
+            sources = [conn.execute(query.format(table="main.expenses"), params).fetchall()]
+            for year, path in self._archives_in(conn, start_date, end_date):
+                whole_year = (start_date or "") <= f"{year:04d}-01-01" and (end_date or "9999") >= f"{year:04d}-12-31"
+                if use_totals and whole_year:
+                    totals_clauses = ["ym BETWEEN ? AND ?"]
+                    totals_params: List = [f"{year:04d}-01", f"{year:04d}-12"]
+                    if categories:
+                        totals_clauses.append(f"category COLLATE NOCASE IN ({','.join('?' * len(categories))})")
+                        totals_params.extend(categories)
+                    sources.append(
+                        conn.execute(
+                            f"SELECT {'ym' if group_by == 'month' else 'NULL'}, {'category' if split else 'NULL'}, "
+                            f"SUM(total), SUM(count), NULL, NULL FROM archive_totals "
+                            f"WHERE {' AND '.join(totals_clauses)} GROUP BY 1, 2",
+                            totals_params,
+                        ).fetchall()
+                    )
+                else:
+                    with self._attached(conn, path):
+                        sources.append(conn.execute(query.format(table="cold.expenses"), params).fetchall())
+            scheduled_end = min(end_date or "9999-12-31", date.today().isoformat())
+            scheduled = virtual_rows(self._pending_recurring(conn, start_date, scheduled_end), start_date, scheduled_end)
+        wanted = {name.lower() for name in categories or []}
+        for row in scheduled:
+            if wanted and row["category"].lower() not in wanted:
+                continue
+            day = date.fromisoformat(row["date"])
+            bucket = {
+                "day": row["date"],
+                "week": (day - timedelta(days=day.weekday())).isoformat(),
+                "month": row["date"][:7],
+            }.get(group_by)
+            sources.append([(bucket, row["category"] if split else None, row["amount"], 1, row["amount"], row["amount"])])
 
-    def monthly_totals_by_category(self) -> Dict[str, Dict[str, float]]:
-        with sqlite3.connect(self.db_path) as conn:
+        # Merge per (bucket, category), folding differently-cased spellings of a category together
+        names = {name.lower(): name for name in categories or []}
+        merged: Dict[Tuple, List] = {}
+        for rows in sources:
+            for bucket, category, total, count, low, high in rows:
+                if not count:
+                    continue
+                key = (bucket, category.lower() if category else None)
+                if category:
+                    names.setdefault(category.lower(), category)
+                if key not in merged:
+                    merged[key] = [0.0, 0, low, high]
+                entry = merged[key]
+                entry[0] += float(total)
+                entry[1] += int(count)
+                if low is not None:
+                    entry[2] = low if entry[2] is None else min(entry[2], low)
+                if high is not None:
+                    entry[3] = high if entry[3] is None else max(entry[3], high)
+        results = []
+        for (bucket, category), (total, count, low, high) in sorted(merged.items(), key=lambda kv: (kv[0][0] or "", kv[0][1] or "")):
+            value = {"sum": total, "count": count, "avg": total / count, "min": low, "max": high}[metric]
+            results.append({"bucket": bucket, "category": names[category] if category else None, "value": value, "count": count})
+        return results
+
+    def monthly_totals(self, through: Optional[str] = None) -> Dict[str, float]:
+        """Totals per YYYY-MM, including pending recurring occurrences up to `through` (default today)."""
+        result: Dict[str, float] = {}
+        for ym, by_category in self.monthly_totals_by_category(through).items():
+            result[ym] = sum(by_category.values())
+        return result
+
+    def monthly_totals_by_category(self, through: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Totals per YYYY-MM and category; archived months come from archive_totals.
+
+        Read from the monthly spend counters the triggers maintain, so the cost depends on the
+        number of months and categories, not on the number of expenses.
+        """
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             rows = conn.execute(
                 """
-                SELECT substr(date, 1, 7) AS ym, category, SUM(amount) AS total
-                FROM expenses
-                GROUP BY ym, category
+                -- Rounded: counters accumulate each insert, edit and delete as float arithmetic
+                SELECT period_key AS ym, category, ROUND(total, 2) AS total
+                FROM spend_counters
+                WHERE period = 'month' AND ABS(total) >= 0.005
+                UNION ALL
+                SELECT ym, category, total FROM archive_totals
                 ORDER BY ym, category
                 """
             ).fetchall()
+            through = self._scheduled_horizon(through or date.today().isoformat())
+            scheduled = virtual_rows(self._pending_recurring(conn, None, through), None, through)
         result: Dict[str, Dict[str, float]] = {}
         for row in rows:
-            ym = row["ym"]
-            category = row["category"]
-            total = float(row["total"])
-            if ym not in result:
-                result[ym] = {}
-            result[ym][category] = total
-        return result
+            month_map = result.setdefault(row["ym"], {})
+            month_map[row["category"]] = month_map.get(row["category"], 0.0) + float(row["total"])
+        for row in scheduled:
+            month_map = result.setdefault(row["date"][:7], {})
+            month_map[row["category"]] = month_map.get(row["category"], 0.0) + row["amount"]
+        return dict(sorted(result.items()))
+
+    def load_forecast_states(self) -> Dict[str, Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT series, state FROM forecast_state").fetchall()
+        return {series: json.loads(state) for series, state in rows}
+
+    def save_forecast_states(self, states: Dict[str, Dict]) -> None:
+        """Replace all stored forecast model states with `states` (series name -> JSON-able dict)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM forecast_state")
+            conn.executemany(
+                "INSERT INTO forecast_state(series, state) VALUES(?, ?)",
+                [(series, json.dumps(state)) for series, state in states.items()],
+            )
+            conn.commit()
 
     def export_csv(self, path: str) -> str:
-        with sqlite3.connect(self.db_path) as conn:
+        """Write every expense, hot and archived, to `path` ordered by date."""
+        query = "SELECT id, date, amount, description, category FROM {table}"
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
-            rows = conn.execute("SELECT id, date, amount, description, category FROM expenses ORDER BY date, id").fetchall()
+            rows = conn.execute(query.format(table="main.expenses")).fetchall()
+            for _, archive_path in self._archives_in(conn, None, None):
+                with self._attached(conn, archive_path):
+                    rows.extend(conn.execute(query.format(table="cold.expenses")).fetchall())
+        rows.sort(key=lambda row: (row["date"], row["id"]))
         with open(path, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(["id", "date", "amount", "description", "category"])
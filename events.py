@@ -0,0 +1,94 @@
+import json
+import queue
+import threading
+from typing import List, Optional
+
+from db import ExpenseDB
+
+
+class EventBroker:
+    """Fans out one dashboard delta per database change to every open event stream.
+
+    A single background thread per process watches the data version. Writes made in this
+    process call notify() to wake it at once; writes from anywhere else (CLI, imports, other
+    workers) are picked up on the next poll. Each change is turned into a delta — the new
+    rows plus this month's totals — exactly once and the same serialized message is handed
+    to every subscriber, so N open dashboards cost one query set per write, not N renders.
+
+    The thread starts with the first subscriber, i.e. in the worker process after any fork.
+    Each open stream holds a server thread, so at most `max_subscribers` streams are accepted
+    per process; subscribe() returns None beyond that and the caller turns the client away,
+    leaving the remaining threads free for ordinary requests.
+    """
+
+    def __init__(
+        self, db: ExpenseDB, poll_interval: float = 2.0, max_queue: int = 100, max_subscribers: int = 4
+    ) -> None:
+        self.db = db
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers: List["queue.Queue[Optional[str]]"] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self) -> "Optional[queue.Queue[Optional[str]]]":
+        """A queue of serialized deltas, or None when max_subscribers streams are already open."""
+        q: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.append(q)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-broker", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q: "queue.Queue[Optional[str]]") -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def notify(self) -> None:
+        """Tell the broker this process just wrote, so the delta goes out without waiting."""
+        self._wake.set()
+
+    def _publish(self, message: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # A client that stopped reading is closed instead of buffering forever
+                self.unsubscribe(q)
+                try:
+                    q.get_nowait()
+                    q.put_nowait(None)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _run(self) -> None:
+        version = self.db.data_version()
+        last_id = self.db.max_expense_id()
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            current = self.db.data_version()
+            if current == version:
+                continue
+            version = current
+            new_rows = self.db.expenses_since(last_id)
+            if new_rows:
+                last_id = max(row["id"] for row in new_rows)
+            delta = {
+                "version": version,
+                "new_rows": new_rows,
+                "month": self.db.get_summary("month"),
+            }
+            self._publish(json.dumps(delta))
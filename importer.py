@@ -0,0 +1,179 @@
+import csv
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from categorizer import CategoryRules
+from db import ExpenseDB
+
+
+# Column mappings for the CSV layouts we know how to read. "generic" matches export_csv,
+# so an exported file can be imported back (and re-importing it adds nothing).
+DEFAULT_PROFILES: Dict[str, Dict] = {
+    "generic": {
+        "date": "date",
+        "amount": "amount",
+        "description": "description",
+        "category": "category",
+        "date_formats": ["%Y-%m-%d"],
+    },
+    "bank": {
+        "date": "Date",
+        "description": "Narration",
+        "debit": "Withdrawal Amt.",
+        "credit": "Deposit Amt.",
+        "date_formats": ["%d/%m/%y", "%d/%m/%Y"],
+    },
+    "signed": {
+        "date": "Date",
+        "amount": "Amount",
+        "description": "Description",
+        "negative_is_expense": True,
+        "date_formats": ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y"],
+    },
+}
+
+
+def load_profiles(path: str = "import_profiles.json") -> Dict[str, Dict]:
+    """Built-in profiles, overridden/extended by an optional JSON file of the same shape."""
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for name, profile in json.load(f).items():
+                    profiles[str(name)] = dict(profile)
+        except Exception:
+            pass
+    return profiles
+
+
+def _parse_amount(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    cleaned = re.sub(r"[^\d.\-]", "", value)
+    if not cleaned or cleaned in {"-", "."}:
+        return None
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _parse_date(value: Optional[str], formats: List[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in formats:
+        if fmt == "%Y-%m-%d" and len(value) == 10 and value[4] == value[7] == "-":
+            # Fast path for the most common layout; strptime costs far more per row
+            try:
+                return date.fromisoformat(value).isoformat()
+            except ValueError:
+                continue
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _map_row(row: Dict[str, str], profile: Dict) -> Optional[Tuple[str, float, str, Optional[str]]]:
+    """Map one CSV record to (date, amount, description, category) or None if it is not an expense."""
+    date_iso = _parse_date(row.get(profile["date"]), profile.get("date_formats", ["%Y-%m-%d"]))
+    description = (row.get(profile["description"]) or "").strip()
+    if not date_iso or not description:
+        return None
+
+    if "debit" in profile:
+        amount = _parse_amount(row.get(profile["debit"]))
+    else:
+        amount = _parse_amount(row.get(profile["amount"]))
+        if amount is not None and profile.get("negative_is_expense"):
+            # Positive values are credits in signed statements
+            amount = -amount
+    if amount is None or amount <= 0:
+        return None
+
+    category = None
+    if profile.get("category"):
+        category = (row.get(profile["category"]) or "").strip() or None
+    return date_iso, round(amount, 2), description, category
+
+
+def _normalize_description(description: str) -> str:
+    return " ".join(description.lower().split())
+
+
+def content_hash(date_iso: str, amount: float, description: str, occurrence: int) -> str:
+    """Stable identity of an imported row.
+
+    `occurrence` numbers identical rows on the same date, so two genuine 50.00 coffees on one day
+    both survive while a second import of the same file still collapses onto the first.
+    """
+    return _hash_key(date_iso, amount, _normalize_description(description), occurrence)
+
+
+def _hash_key(date_iso: str, amount: float, normalized: str, occurrence: int) -> str:
+    key = f"{date_iso}|{amount:.2f}|{normalized}|{occurrence}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _chunks(records: Iterable[Tuple[str, float, str, Optional[str]]], size: int) -> Iterator[List]:
+    chunk: List = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def import_csv(
+    db: ExpenseDB,
+    rules: CategoryRules,
+    stream: TextIO,
+    profile: Dict,
+    chunk_size: int = 1000,
+) -> Dict[str, int]:
+    """Stream a CSV statement into the database.
+
+    Rows are read, hashed and categorized one chunk at a time and handed to
+    ExpenseDB.bulk_load, so the whole statement lands in one transaction (all of it or
+    none) with counters and tags updated set-wise. Rows already present (same content
+    hash) are skipped by the unique index. Memory use grows only with the occurrence
+    counts, one small entry per distinct (date, amount, description).
+    """
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "skipped": 0}
+    # Not reset per day: identical rows share a count wherever they appear in the file
+    occurrences: Dict[Tuple[str, float, str], int] = {}
+
+    def records() -> Iterator[Tuple[str, float, str, Optional[str], str]]:
+        for row in csv.DictReader(stream):
+            stats["read"] += 1
+            mapped = _map_row(row, profile)
+            if mapped is None:
+                stats["skipped"] += 1
+                continue
+            date_iso, amount, description, category = mapped
+            # Same normalization as content_hash, or rows differing only in spacing share a hash
+            key = (date_iso, amount, _normalize_description(description))
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            yield date_iso, amount, description, category, _hash_key(*key, occurrence)
+
+    def batches() -> Iterator[List[Tuple[str, float, str, str, str]]]:
+        for chunk in _chunks(records(), chunk_size):
+            pending = [i for i, rec in enumerate(chunk) if not rec[3]]
+            guessed = rules.categorize_many([chunk[i][2] for i in pending])
+            categories = [rec[3] for rec in chunk]
+            for i, category in zip(pending, guessed):
+                categories[i] = category
+            yield [(rec[0], rec[1], rec[2], categories[i], rec[4]) for i, rec in enumerate(chunk)]
+
+    stats["inserted"] = db.bulk_load(batches())
+    stats["duplicates"] = stats["read"] - stats["skipped"] - stats["inserted"]
+    return stats
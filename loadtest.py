@@ -0,0 +1,364 @@
+"""Offline load generator for the Flask app.
+
+Seeds a throwaway database, starts the app in a separate process on localhost and drives a
+weighted mix of routes at one or more concurrency levels, then writes a JSON report with
+throughput and p50/p95/p99 latency per route.
+
+    python loadtest.py --db-size 50000 --concurrency 1,8,32 --duration 20 --output report.json
+    python loadtest.py --compare baseline.json --output report.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "index=30,list=20,summary=15,predict=10,add=15,chat=10"
+
+SEED_DESCRIPTIONS = [
+    ("Groceries from supermarket", "Food"), ("Dinner at restaurant", "Food"), ("Coffee at cafe", "Food"),
+    ("Uber ride to office", "Travel"), ("Petrol station", "Travel"), ("Train ticket", "Travel"),
+    ("Amazon purchase", "Shopping"), ("Clothes from mall", "Shopping"),
+    ("Electricity bill", "Bills"), ("Mobile recharge", "Bills"), ("Rent payment", "Bills"),
+    ("Netflix subscription", "Entertainment"), ("Movie tickets", "Entertainment"),
+    ("Pharmacy medicine", "Health"), ("Gym membership", "Health"), ("Misc expense", "Other"),
+]
+
+CHAT_MESSAGES = [
+    "show summary", "how much on food", "list expenses", "predict next month",
+    "biggest category", "spent 120 on uber", "show stats",
+]
+
+# A request is (method, path, form body or None)
+Request = Tuple[str, str, Optional[Dict[str, str]]]
+
+
+def _route_index(_: random.Random) -> Request:
+    return "GET", "/", None
+
+
+def _route_list(rng: random.Random) -> Request:
+    args = {}
+    if rng.random() < 0.5:
+        args["category"] = rng.choice(SEED_DESCRIPTIONS)[1]
+    if rng.random() < 0.3:
+        args["start"] = (date.today() - timedelta(days=rng.choice([7, 30, 90]))).isoformat()
+    return "GET", "/list" + ("?" + urlencode(args) if args else ""), None
+
+
+def _route_summary(rng: random.Random) -> Request:
+    return "GET", "/summary?" + urlencode({"period": rng.choice(["day", "week", "month", "all"])}), None
+
+
+def _route_predict(rng: random.Random) -> Request:
+    return "GET", "/predict?" + urlencode({"months": rng.choice([3, 6, 12])}), None
+
+
+def _route_add(rng: random.Random) -> Request:
+    description, category = rng.choice(SEED_DESCRIPTIONS)
+    form = {
+        "amount": f"{rng.uniform(20, 3000):.2f}",
+        "description": description,
+        "date": date.today().isoformat(),
+        "category": category,
+    }
+    return "POST", "/add", form
+
+
+def _route_chat(rng: random.Random) -> Request:
+    return "POST", "/chat", {"message": rng.choice(CHAT_MESSAGES)}
+
+
+ROUTES: Dict[str, Callable[[random.Random], Request]] = {
+    "index": _route_index,
+    "list": _route_list,
+    "summary": _route_summary,
+    "predict": _route_predict,
+    "add": _route_add,
+    "chat": _route_chat,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route '{name}'. Choose from {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise argparse.ArgumentTypeError("Mix needs at least one positive weight")
+    return mix
+
+
+def seed_database(db_path: str, size: int, seed: int) -> None:
+    from db import ExpenseDB
+
+    db = ExpenseDB(db_path=db_path)
+    rng = random.Random(seed)
+    today = date.today()
+    batch: List[Tuple[str, float, str, str, Optional[str]]] = []
+    for _ in range(size):
+        description, category = rng.choice(SEED_DESCRIPTIONS)
+        day = today - timedelta(days=rng.randint(0, 730))
+        batch.append((day.isoformat(), round(rng.uniform(20, 3000), 2), description, category, None))
+        if len(batch) >= 5000:
+            db.add_expenses_bulk(batch)
+            batch = []
+    if batch:
+        db.add_expenses_bulk(batch)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: str, categories_path: str, port: int, kind: str = "dev", workers: int = 0, threads: int = 8) -> subprocess.Popen:
+    env = dict(os.environ, EXPENSES_DB=db_path, EXPENSES_CATEGORIES=categories_path)
+    if kind == "prod":
+        command = [sys.executable, os.path.join(HERE, "serve.py"), "--bind", f"127.0.0.1:{port}", "--threads", str(threads)]
+        if workers:
+            command += ["--workers", str(workers)]
+    else:
+        code = (
+            "import sys; sys.path.insert(0, %r)\n"
+            "from werkzeug.serving import make_server\n"
+            "from app import app\n"
+            "make_server('127.0.0.1', %d, app, threaded=True).serve_forever()\n" % (HERE, port)
+        )
+        command = [sys.executable, "-c", code]
+    # Per-request access logs would dominate the server's own cost, so silence them
+    proc = subprocess.Popen(
+        command,
+        env=env,
+        cwd=os.path.dirname(db_path),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("Server process exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("Server did not start within 30s")
+
+
+def _send(host: str, port: int, req: Request) -> int:
+    method, path, form = req
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        body = urlencode(form) if form is not None else None
+        headers = {"Content-Type": "application/x-www-form-urlencoded"} if form is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_level(host: str, port: int, mix: Dict[str, float], concurrency: int, duration: float, seed: int) -> Dict:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    latencies: Dict[str, List[float]] = {n: [] for n in names}
+    errors: Dict[str, int] = {n: 0 for n in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        local_lat: Dict[str, List[float]] = {n: [] for n in names}
+        local_err: Dict[str, int] = {n: 0 for n in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            req = ROUTES[name](rng)
+            started = time.perf_counter()
+            try:
+                status = _send(host, port, req)
+                ok = status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+            elapsed = time.perf_counter() - started
+            if ok:
+                local_lat[name].append(elapsed)
+            else:
+                local_err[name] += 1
+        with lock:
+            for n in names:
+                latencies[n].extend(local_lat[n])
+                errors[n] += local_err[n]
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    routes: Dict[str, Dict] = {}
+    total_ok = 0
+    for n in names:
+        values = sorted(latencies[n])
+        total_ok += len(values)
+        routes[n] = {
+            "requests": len(values),
+            "errors": errors[n],
+            "throughput_rps": len(values) / wall if wall else 0.0,
+            "mean_ms": 1000 * sum(values) / len(values) if values else 0.0,
+            "p50_ms": 1000 * percentile(values, 50),
+            "p95_ms": 1000 * percentile(values, 95),
+            "p99_ms": 1000 * percentile(values, 99),
+            "max_ms": 1000 * values[-1] if values else 0.0,
+        }
+    all_values = sorted(v for n in names for v in latencies[n])
+    return {
+        "concurrency": concurrency,
+        "duration_s": wall,
+        "requests": total_ok,
+        "errors": sum(errors.values()),
+        "throughput_rps": total_ok / wall if wall else 0.0,
+        "p50_ms": 1000 * percentile(all_values, 50),
+        "p95_ms": 1000 * percentile(all_values, 95),
+        "p99_ms": 1000 * percentile(all_values, 99),
+        "routes": routes,
+    }
+
+
+def compare_reports(baseline: Dict, current: Dict) -> List[str]:
+    """Human-readable deltas for levels and routes present in both reports."""
+    lines: List[str] = []
+    base_levels = {lvl["concurrency"]: lvl for lvl in baseline.get("levels", [])}
+    for level in current.get("levels", []):
+        base = base_levels.get(level["concurrency"])
+        if not base:
+            continue
+        for name, stats in level["routes"].items():
+            old = base["routes"].get(name)
+            if not old or not old["requests"] or not stats["requests"]:
+                continue
+            lines.append(
+                f"c={level['concurrency']:<3} {name:<8} "
+                f"rps {old['throughput_rps']:8.1f} -> {stats['throughput_rps']:8.1f}  "
+                f"p95 {old['p95_ms']:7.1f} -> {stats['p95_ms']:7.1f} ms  "
+                f"p99 {old['p99_ms']:7.1f} -> {stats['p99_ms']:7.1f} ms"
+            )
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent load test for the expense tracker web app")
+    parser.add_argument("--db-size", type=int, default=10000, help="Rows to seed into the test database")
+    parser.add_argument("--concurrency", type=str, default="1,4,16", help="Comma-separated client thread counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds to run each concurrency level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unmeasured traffic before each level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Route weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--server", choices=["dev", "prod"], default="dev", help="Threaded dev server or serve.py (gunicorn)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes for --server prod (default: one per core)")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per worker for --server prod")
+    parser.add_argument("--url", type=str, default=None, help="Target an already running server (host:port) instead of starting one")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report here")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    sys.path.insert(0, HERE)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    workdir = tempfile.mkdtemp(prefix="expense-loadtest-")
+    proc: Optional[subprocess.Popen] = None
+    try:
+        if args.url:
+            host, _, port_str = args.url.replace("http://", "").rstrip("/").partition(":")
+            port = int(port_str or 80)
+        else:
+            db_path = os.path.join(workdir, "expenses.db")
+            categories_path = os.path.join(HERE, "categories.json")
+            print(f"Seeding {args.db_size} rows into {db_path} ...")
+            seed_database(db_path, args.db_size, args.seed)
+            host, port = "127.0.0.1", _free_port()
+            proc = start_server(db_path, categories_path, port, args.server, args.workers, args.threads)
+
+        results = []
+        for concurrency in levels:
+            if args.warmup > 0:
+                run_level(host, port, args.mix, concurrency, args.warmup, args.seed + 1)
+            print(f"Running concurrency={concurrency} for {args.duration:.0f}s ...")
+            level = run_level(host, port, args.mix, concurrency, args.duration, args.seed)
+            results.append(level)
+            print(
+                f"  {level['throughput_rps']:.1f} req/s, p50 {level['p50_ms']:.1f} ms, "
+                f"p95 {level['p95_ms']:.1f} ms, p99 {level['p99_ms']:.1f} ms, errors {level['errors']}"
+            )
+            for name, stats in sorted(level["routes"].items()):
+                print(
+                    f"    {name:<8} {stats['requests']:>7} req  {stats['throughput_rps']:8.1f}/s  "
+                    f"p50 {stats['p50_ms']:7.1f}  p95 {stats['p95_ms']:7.1f}  p99 {stats['p99_ms']:7.1f} ms"
+                )
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "db_size": args.db_size,
+            "mix": args.mix,
+            "duration_s": args.duration,
+            "seed": args.seed,
+            "target": args.url or args.server,
+            "workers": args.workers if args.server == "prod" else 1,
+            "threads": args.threads if args.server == "prod" else None,
+        },
+        "levels": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {os.path.abspath(args.output)}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("Comparison with baseline:")
+        for line in compare_reports(baseline, report) or ["(no overlapping levels/routes)"]:
+            print("  " + line)
+
+
+if __name__ == "__main__":
+    main()
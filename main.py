@@ -6,6 +6,9 @@ from db import ExpenseDB
 from categorizer import CategoryRules
 from predictor import Predictor
 from bot import ChatBot
+from importer import import_csv, load_profiles
+from budgets import budget_warnings
+from recurring import FREQUENCIES, RecurringScheduler
 
 
 def parse_date(value: str) -> str:
@@ -24,36 +27,59 @@ def add_command(args: argparse.Namespace, db: ExpenseDB, rules: CategoryRules) -
     category: Optional[str] = args.category
     if not category:
         category = rules.categorize(args.description)
-    expense_id = db.add_expense(
-        date_iso=args.date,
-        amount=args.amount,
-        description=args.description,
-        category=category,
-    )
+    try:
+        expense_id = db.add_expense(
+            date_iso=args.date,
+            amount=args.amount,
+            description=args.description,
+            category=category,
+        )
+    except ValueError as error:
+        print(f"Could not add expense: {error}")
+        return
     print(f"Added expense #{expense_id} | {args.date} | {args.amount:.2f} | {category} | {args.description}")
+    for warning in budget_warnings(db, category, args.date):
+        print(warning)
 
 
 def list_command(args: argparse.Namespace, db: ExpenseDB) -> None:
-    expenses = db.list_expenses(start_date=args.start, end_date=args.end, category=args.category, limit=args.limit)
+    try:
+        expenses = db.list_expenses(start_date=args.start, end_date=args.end, category=args.category, limit=args.limit, tags=args.tags)
+    except ValueError as error:
+        print(f"Invalid tag filter: {error}")
+        return
     if not expenses:
         print("No expenses matched.")
         return
     print("id  | date       | amount   | category     | description")
     print("-" * 70)
     for exp in expenses:
-        print(f"{exp['id']:<3} | {exp['date']} | {exp['amount']:<8.2f} | {exp['category']:<12} | {exp['description']}")
+        print(f"{exp['id'] or '↻':<3} | {exp['date']} | {exp['amount']:<8.2f} | {exp['category']:<12} | {exp['description']}")
 
 
 def summary_command(args: argparse.Namespace, db: ExpenseDB) -> None:
     period = args.period
-    summary = db.get_summary(period=period)
-    print(f"Summary ({period})")
+    try:
+        summary = db.get_summary(period=period, tags=args.tags)
+    except ValueError as error:
+        print(f"Invalid tag filter: {error}")
+        return
+    print(f"Summary ({period}{', tags: ' + args.tags if args.tags else ''})")
     print("Total: {:.2f}".format(summary["total"]))
     print("By category:")
     for category, amount in sorted(summary["by_category"].items(), key=lambda x: -x[1]):
         print(f"- {category}: {amount:.2f}")
 
 
+def tags_command(_: argparse.Namespace, db: ExpenseDB) -> None:
+    tags = db.list_tags(limit=50)
+    if not tags:
+        print("No tags yet.")
+        return
+    for tag in tags:
+        print(f"#{tag['name']:<20} {tag['count']}")
+
+
 def predict_command(args: argparse.Namespace, db: ExpenseDB) -> None:
     predictor = Predictor(db)
     months_count = args.months
@@ -69,6 +95,114 @@ def export_command(args: argparse.Namespace, db: ExpenseDB) -> None:
     print(f"Exported to {export_path}")
 
 
+def import_command(args: argparse.Namespace, db: ExpenseDB, rules: CategoryRules) -> None:
+    profiles = load_profiles()
+    if args.profile not in profiles:
+        print(f"Unknown profile '{args.profile}'. Available: {', '.join(sorted(profiles))}")
+        return
+    with open(args.path, "r", newline="", encoding="utf-8-sig") as f:
+        stats = import_csv(db, rules, f, profiles[args.profile], chunk_size=args.chunk_size)
+    print(
+        f"Imported {stats['inserted']} new expense(s) from {stats['read']} row(s) "
+        f"({stats['duplicates']} duplicate(s), {stats['skipped']} skipped)"
+    )
+
+
+def budget_command(args: argparse.Namespace, db: ExpenseDB) -> None:
+    if args.action == "set":
+        if not args.category or args.limit is None or args.limit <= 0:
+            print("Please provide --category and a positive --limit.")
+            return
+        db.set_budget(category=args.category, period=args.period, limit_amount=args.limit)
+        print(f"Set {args.period}ly budget for '{args.category}' to {args.limit:.2f}.")
+    elif args.action == "remove":
+        if db.remove_budget(category=args.category or "", period=args.period):
+            print(f"Removed {args.period}ly budget for '{args.category}'.")
+        else:
+            print(f"No {args.period}ly budget for '{args.category}'.")
+    else:
+        statuses = db.budget_status()
+        if not statuses:
+            print("No budgets set.")
+            return
+        print("category     | period | limit     | spent     | remaining")
+        print("-" * 60)
+        for st in statuses:
+            print(f"{st['category']:<12} | {st['period']:<6} | {st['limit']:<9.2f} | {st['spent']:<9.2f} | {st['remaining']:.2f}")
+
+
+def archive_command(args: argparse.Namespace, db: ExpenseDB) -> None:
+    if args.action == "run":
+        years = set(args.year or [])
+        if args.before:
+            years |= {year for year in db.hot_years() if year < args.before}
+        if not years:
+            print("Please provide --year or --before (nothing to archive).")
+            return
+        for year in sorted(years):
+            try:
+                archive = db.archive_year(year, directory=args.dir, vacuum=not args.no_vacuum)
+            except ValueError as error:
+                print(f"{year}: {error}")
+                continue
+            print(f"Archived {archive['row_count']} expenses ({archive['total']:.2f}) from {year} to {archive['path']}")
+        return
+    archives = db.list_archives()
+    if not archives:
+        print("No archived years.")
+        return
+    print("year | expenses | total       | size     | file")
+    print("-" * 70)
+    for a in archives:
+        size = f"{a['size'] / 1024:.0f} KB" if a["size"] is not None else "missing"
+        print(f"{a['year']} | {a['row_count']:<8} | {a['total']:<11.2f} | {size:<8} | {a['path']}")
+
+
+def _describe_frequency(frequency: str, interval: int) -> str:
+    units = {"daily": "days", "weekly": "weeks", "monthly": "months", "custom": "days"}
+    if interval == 1 and frequency != "custom":
+        return frequency
+    return f"{interval} {units[frequency]}"
+
+
+def recurring_command(args: argparse.Namespace, db: ExpenseDB, rules: CategoryRules) -> None:
+    if args.action == "add":
+        if args.amount is None or args.amount <= 0 or not args.description:
+            print("Please provide a positive --amount and a --description.")
+            return
+        category = args.category or rules.categorize(args.description)
+        try:
+            rule_id = db.add_recurring(
+                description=args.description,
+                amount=args.amount,
+                category=category,
+                frequency=args.every,
+                start_date=args.start,
+                interval=args.interval,
+                end_date=args.until,
+            )
+        except ValueError as error:
+            print(f"Could not add recurring expense: {error}")
+            return
+        every = _describe_frequency(args.every, args.interval)
+        print(f"Added recurring #{rule_id}: {args.amount:.2f} {category} '{args.description}' every {every} from {args.start}")
+    elif args.action == "remove":
+        if args.id is not None and db.remove_recurring(args.id):
+            print(f"Removed recurring #{args.id}.")
+        else:
+            print("No such recurring expense.")
+    else:
+        items = db.list_recurring()
+        if not items:
+            print("No recurring expenses.")
+            return
+        print("id  | amount   | every        | next due   | category     | description")
+        print("-" * 75)
+        for item in items:
+            every = _describe_frequency(item["frequency"], item["interval"])
+            print(f"{item['id']:<3} | {item['amount']:<8.2f} | {every:<12} | {item['next_due']} | {item['category']:<12} | {item['description']}")
+
+
 def categories_command(args: argparse.Namespace, rules: CategoryRules) -> None:
     if args.action == "show":
         rules_dict = rules.get_rules()
@@ -115,9 +249,13 @@ def build_parser() -> argparse.ArgumentParser:
     list_p.add_argument("--end", type=parse_date, default=None)
     list_p.add_argument("--category", type=str, default=None)
     list_p.add_argument("--limit", type=int, default=50)
+    list_p.add_argument("--tags", type=str, default=None, help="Tag filter, e.g. 'food AND NOT pizza' or 'uber | taxi'")
 
     summary_p = sub.add_parser("summary", help="Show totals and by-category for a period")
     summary_p.add_argument("period", choices=["day", "week", "month", "all"], help="Aggregate period")
+    summary_p.add_argument("--tags", type=str, default=None, help="Only expenses matching this tag filter")
+
+    sub.add_parser("tags", help="Show the most used tags")
 
     predict_p = sub.add_parser("predict", help="Predict next month totals")
     predict_p.add_argument("--months", type=int, default=6, help="Number of past months to learn from")
@@ -125,6 +263,35 @@ def build_parser() -> argparse.ArgumentParser:
     export_p = sub.add_parser("export", help="Export all expenses to CSV")
     export_p.add_argument("path", type=str, help="Output CSV file path")
 
+    import_p = sub.add_parser("import", help="Import expenses from a bank statement CSV")
+    import_p.add_argument("path", type=str, help="CSV file to import")
+    import_p.add_argument("--profile", type=str, default="generic", help="Column mapping profile (see import_profiles.json)")
+    import_p.add_argument("--chunk-size", type=int, default=1000, help="Rows read and categorized per batch")
+
+    budget_p = sub.add_parser("budget", help="Manage per-category budgets")
+    budget_p.add_argument("action", choices=["show", "set", "remove"])
+    budget_p.add_argument("--category", type=str, help="Category name (for set/remove)")
+    budget_p.add_argument("--limit", type=float, help="Budget amount (for set)")
+    budget_p.add_argument("--period", choices=["week", "month"], default="month")
+
+    rec_p = sub.add_parser("recurring", help="Manage recurring expenses (rent, subscriptions)")
+    rec_p.add_argument("action", choices=["show", "add", "remove"])
+    rec_p.add_argument("--amount", type=float, help="Amount per occurrence (for add)")
+    rec_p.add_argument("--description", type=str, help="Description (for add)")
+    rec_p.add_argument("--category", type=str, default=None, help="Optional category; otherwise auto-categorized")
+    rec_p.add_argument("--every", choices=FREQUENCIES, default="monthly", help="'custom' means every --interval days")
+    rec_p.add_argument("--interval", type=int, default=1, help="Repeat every N periods (days for 'custom')")
+    rec_p.add_argument("--start", type=parse_date, default=date.today().isoformat(), help="First occurrence")
+    rec_p.add_argument("--until", type=parse_date, default=None, help="Last possible occurrence date")
+    rec_p.add_argument("--id", type=int, help="Recurring id (for remove)")
+
+    arch_p = sub.add_parser("archive", help="Move closed years into read-only archive databases")
+    arch_p.add_argument("action", choices=["show", "run"])
+    arch_p.add_argument("--year", type=int, action="append", help="Year to archive (repeatable; for run)")
+    arch_p.add_argument("--before", type=int, help="Archive every year before this one (for run)")
+    arch_p.add_argument("--dir", type=str, default=None, help="Archive directory (default: archive/ next to the database)")
+    arch_p.add_argument("--no-vacuum", action="store_true", help="Skip compacting the database afterwards")
+
     cats_p = sub.add_parser("categories", help="Manage categorization keywords")
     cats_p.add_argument("action", choices=["show", "add", "remove"]) 
     cats_p.add_argument("--category", type=str, help="Category name (for add/remove)")
@@ -141,6 +308,7 @@ def main() -> None:
 
     db = ExpenseDB(db_path="expenses.db")
     rules = CategoryRules(path="categories.json")
+    RecurringScheduler(db).run_due()
 
     if args.command == "add":
         add_command(args, db, rules)
@@ -148,10 +316,20 @@ def main() -> None:
         list_command(args, db)
     elif args.command == "summary":
         summary_command(args, db)
+    elif args.command == "tags":
+        tags_command(args, db)
     elif args.command == "predict":
         predict_command(args, db)
     elif args.command == "export":
         export_command(args, db)
+    elif args.command == "import":
+        import_command(args, db, rules)
+    elif args.command == "budget":
+        budget_command(args, db)
+    elif args.command == "recurring":
+        recurring_command(args, db, rules)
+    elif args.command == "archive":
+        archive_command(args, db)
     elif args.command == "categories":
         categories_command(args, rules)
     elif args.command == "chat":
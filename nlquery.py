@@ -0,0 +1,202 @@
+import calendar
+import re
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# A parsed question is a small query AST:
+#   {"metric": "sum" | "count" | "avg" | "min" | "max",
+#    "categories": ["Food", "Travel"],          # empty = every category
+#    "start": "2026-07-19" | None, "end": "2026-10-18" | None,   # None = unbounded
+#    "group_by": "day" | "week" | "month" | "category" | None,
+#    "label": "the last 3 months",
+#    "explicit_range": True}                    # False when "this month" was assumed
+# ExpenseDB.aggregate compiles it into one GROUP BY statement.
+METRICS = ("sum", "count", "avg", "min", "max")
+GROUPINGS = ("day", "week", "month", "category")
+
+_NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+_MONTHS = {name.lower(): index for index, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): index for index, name in enumerate(calendar.month_abbr) if name})
+_MONTH_NAMES = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_ISO = r"\d{4}-\d{2}-\d{2}"
+
+_SINGLE = r"(?:expense|purchase|payment|transaction|amount)s?\b(?!\s+categor)"
+_METRIC_PATTERNS = [
+    ("count", re.compile(r"\b(?:how many|number of|count)\b")),
+    ("avg", re.compile(r"\b(?:average|avg|mean|typical)\b")),
+    # "largest food expense", but not "largest expense category" (that is a ranking question)
+    ("max", re.compile(rf"\b(?:largest|biggest|most expensive|highest|max(?:imum)?)\s+(?:\w+\s+)??{_SINGLE}")),
+    ("min", re.compile(rf"\b(?:smallest|cheapest|lowest|min(?:imum)?)\s+(?:\w+\s+)??{_SINGLE}")),
+]
+_GROUP_RE = re.compile(r"\b(?:by|per|each|every|grouped by|split by)\s+(day|week|month|category)\b")
+_GROUP_ADVERBS = {"daily": "day", "weekly": "week", "monthly": "month"}
+_RELATIVE_RE = re.compile(
+    r"\b(last|past|previous|prior)\s+(?:(\d+|" + "|".join(_NUMBER_WORDS) + r")\s+)?(day|week|month|year)s?\b"
+)
+_RANGE_RE = re.compile(rf"\b(?:from|between)\s+({_ISO})\s+(?:to|and|until|-)\s+({_ISO})\b")
+_SINCE_RE = re.compile(rf"\bsince\s+(?:({_ISO})|({_MONTH_NAMES})(?:\s+(\d{{4}}))?|(\d{{4}}))\b")
+_ON_RE = re.compile(rf"\bon\s+({_ISO})\b")
+_MONTH_RE = re.compile(rf"\b(?:in|during|for)?\s*({_MONTH_NAMES})(?:\s+(\d{{4}}))?\b")
+_YEAR_RE = re.compile(r"\b(?:in|during|for)\s+(\d{4})\b")
+
+
+def _shift_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def parse_date_range(text: str, today: Optional[date] = None) -> Optional[Tuple[Optional[str], Optional[str], str]]:
+    """(start, end, label) for the date phrase in `text`, or None if it has none.
+
+    Understands "today", "yesterday", "this/last week|month|year" (calendar periods),
+    "last/past N days|weeks|months|years" (rolling, ending today), "since <date|month|year>",
+    "from <date> to <date>", "on <date>", "in March [2025]", "in 2024" and "all time".
+    """
+    today = today or date.today()
+    lowered = text.lower()
+
+    match = _RANGE_RE.search(lowered)
+    if match:
+        start, end = sorted(match.groups())
+        return start, end, f"{start} to {end}"
+    match = _SINCE_RE.search(lowered)
+    if match:
+        iso, month_name, month_year, year = match.groups()
+        if iso:
+            start = iso
+        elif month_name:
+            month = _MONTHS[month_name]
+            year = max(1, int(month_year)) if month_year else today.year
+            if not month_year and month > today.month:
+                # "since November" asked in October means since last November
+                year -= 1
+            start = date(year, month, 1).isoformat()
+        else:
+            start = f"{year}-01-01"
+        return start, today.isoformat(), f"since {start}"
+    match = _ON_RE.search(lowered)
+    if match:
+        return match.group(1), match.group(1), f"on {match.group(1)}"
+
+    match = _RELATIVE_RE.search(lowered)
+    if match:
+        word, number, unit = match.groups()
+        if number is None and word != "past":
+            # "last month" is the previous calendar month, "past month" the last 30-ish days
+            if unit == "day":
+                day = today - timedelta(days=1)
+                return day.isoformat(), day.isoformat(), "yesterday"
+            if unit == "week":
+                start = today - timedelta(days=today.weekday() + 7)
+                return start.isoformat(), (start + timedelta(days=6)).isoformat(), "last week"
+            if unit == "month":
+                previous = _shift_months(today.replace(day=1), -1)
+                start, end = _month_range(previous.year, previous.month)
+                return start.isoformat(), end.isoformat(), "last month"
+            return f"{today.year - 1}-01-01", f"{today.year - 1}-12-31", "last year"
+        count = int(number) if number and number.isdigit() else _NUMBER_WORDS.get(number or "a", 1)
+        label = f"the last {count} {unit}s" if count > 1 else f"the past {unit}"
+        try:
+            if unit == "day":
+                start = today - timedelta(days=count - 1)
+            elif unit == "week":
+                start = today - timedelta(days=7 * count - 1)
+            else:
+                start = _shift_months(today, -count * (12 if unit == "year" else 1)) + timedelta(days=1)
+        except (OverflowError, ValueError):
+            # "the last 5000 years" reaches past year 1: everything up to today
+            return None, today.isoformat(), label
+        return start.isoformat(), today.isoformat(), label
+
+    if re.search(r"\btoday\b", lowered):
+        return today.isoformat(), today.isoformat(), "today"
+    if re.search(r"\byesterday\b", lowered):
+        day = today - timedelta(days=1)
+        return day.isoformat(), day.isoformat(), "yesterday"
+    match = re.search(r"\bthis\s+(week|month|year)\b", lowered)
+    if match:
+        unit = match.group(1)
+        if unit == "week":
+            start = today - timedelta(days=today.weekday())
+        elif unit == "month":
+            start = today.replace(day=1)
+        else:
+            start = today.replace(month=1, day=1)
+        return start.isoformat(), today.isoformat(), f"this {unit}"
+    if re.search(r"\b(?:all time|ever|overall|so far|in total)\b", lowered):
+        return None, None, "all time"
+
+    match = _MONTH_RE.search(lowered)
+    # "may" and "mar" are also ordinary words; only take them with a year or after in/during/for
+    if match and (match.group(2) or re.search(rf"\b(?:in|during|for)\s+{match.group(1)}\b", lowered)):
+        month = _MONTHS[match.group(1)]
+        year = max(1, int(match.group(2))) if match.group(2) else today.year
+        if not match.group(2) and month > today.month:
+            # "in November" asked in October means last November
+            year -= 1
+        start, end = _month_range(year, month)
+        return start.isoformat(), end.isoformat(), f"{calendar.month_name[month]} {year}"
+    match = _YEAR_RE.search(lowered)
+    if match:
+        year = match.group(1)
+        return f"{year}-01-01", f"{year}-12-31", year
+    return None
+
+
+def parse_categories(text: str, categories: Iterable[str]) -> List[str]:
+    """Known category names mentioned in `text`, in the order they appear."""
+    lowered = text.lower()
+    found: List[Tuple[int, str]] = []
+    for name in categories:
+        stem = name.lower().rstrip("s")
+        match = re.search(rf"\b{re.escape(stem)}s?\b", lowered)
+        if match:
+            found.append((match.start(), name))
+    return [name for _, name in sorted(found)]
+
+
+def parse_question(text: str, categories: Iterable[str], today: Optional[date] = None) -> Dict:
+    """Parse a spending question into the query AST described at the top of this module.
+
+    Missing parts default to: metric "sum", every category, this month, no grouping.
+    "food vs travel over the last 3 months by week" ->
+        {"metric": "sum", "categories": ["Food", "Travel"], "group_by": "week", ...}
+    """
+    today = today or date.today()
+    lowered = text.lower()
+    metric = "sum"
+    for name, pattern in _METRIC_PATTERNS:
+        if pattern.search(lowered):
+            metric = name
+            break
+    group_match = _GROUP_RE.search(lowered)
+    group_by = group_match.group(1) if group_match else None
+    if group_by is None:
+        for adverb, grouping in _GROUP_ADVERBS.items():
+            if re.search(rf"\b{adverb}\b", lowered):
+                group_by = grouping
+                break
+    date_range = parse_date_range(lowered, today)
+    if date_range is None:
+        start, end, label = today.replace(day=1).isoformat(), today.isoformat(), "this month"
+    else:
+        start, end, label = date_range
+    return {
+        "metric": metric,
+        "categories": parse_categories(lowered, categories),
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "label": label,
+        "explicit_range": date_range is not None,
+    }
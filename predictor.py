@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+import calendar
+from datetime import date
+from typing import Dict, List, Optional, Tuple
 
 from db import ExpenseDB
 
@@ -25,12 +27,191 @@ def _linear_regression(x_values: List[float], y_values: List[float]) -> Tuple[fl
     return slope, intercept
 
 
+SEASON_LENGTH = 12
+# Smoothing parameters tried when a seasonal model is (re)fitted: (alpha, beta, gamma)
+_PARAM_GRID = [
+    (alpha, beta, gamma)
+    for alpha in (0.1, 0.3, 0.5)
+    for beta in (0.0, 0.05, 0.2)
+    for gamma in (0.1, 0.3, 0.5)
+]
+TOTAL_SERIES = "__total__"
+
+
+def _month_index(ym: str) -> int:
+    year, month = ym.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def _month_key(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _month_end(first_day_iso: str) -> str:
+    year, month = int(first_day_iso[:4]), int(first_day_iso[5:7])
+    return f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+
+
+def _holt_winters_step(state: Dict, y: float) -> float:
+    """Fold one observed month into an additive Holt-Winters state in place.
+
+    Returns the one-step-ahead forecast that was made for this month before seeing it.
+    """
+    alpha, beta, gamma = state["alpha"], state["beta"], state["gamma"]
+    m = state["t"] % SEASON_LENGTH
+    level, trend, seasonal = state["level"], state["trend"], state["seasonal"][m]
+    forecast = level + trend + seasonal
+    new_level = alpha * (y - seasonal) + (1 - alpha) * (level + trend)
+    state["trend"] = beta * (new_level - level) + (1 - beta) * trend
+    state["seasonal"][m] = gamma * (y - new_level) + (1 - gamma) * seasonal
+    state["level"] = new_level
+    state["t"] += 1
+    return forecast
+
+
+def _holt_winters_fit(series: List[float]) -> Dict:
+    """Fit an additive Holt-Winters model to a dense monthly series of at least two seasons.
+
+    Level/trend/seasonals are initialised from the first two seasons, then the smoothing
+    parameters with the lowest one-step-ahead squared error over the whole series win.
+    """
+    first = series[:SEASON_LENGTH]
+    second = series[SEASON_LENGTH:2 * SEASON_LENGTH]
+    first_mean = sum(first) / SEASON_LENGTH
+    trend0 = (sum(second) / SEASON_LENGTH - first_mean) / SEASON_LENGTH
+    seasonal0 = [y - first_mean for y in first]
+
+    best: Dict = {}
+    best_error = float("inf")
+    for alpha, beta, gamma in _PARAM_GRID:
+        state = {
+            "alpha": alpha, "beta": beta, "gamma": gamma,
+            "level": first_mean, "trend": trend0, "seasonal": list(seasonal0), "t": 0,
+        }
+        error = 0.0
+        for t, y in enumerate(series):
+            forecast = _holt_winters_step(state, y)
+            if t >= SEASON_LENGTH:
+                error += (y - forecast) ** 2
+        if error < best_error:
+            best_error, best = error, state
+    return best
+
+
+def _holt_winters_forecast(state: Dict, horizon: int) -> float:
+    m = (state["t"] + horizon - 1) % SEASON_LENGTH
+    return state["level"] + horizon * state["trend"] + state["seasonal"][m]
+
+
 class Predictor:
     def __init__(self, db: ExpenseDB) -> None:
         self.db = db
 
     def predict_next_month(self, months_back: int = 6) -> Dict:
-        """Predict the next month's total and per-category spend.
+        """Predict next calendar month's total and per-category spend.
+
+        Uses seasonal Holt-Winters models once two full years of closed months exist, and the
+        linear trend over the last `months_back` months otherwise. Recurring expenses already
+        scheduled for next month act as a floor for their category.
+        """
+        forecast = self._cached_seasonal()
+        if forecast is None:
+            # One aggregation serves both models; the open month counts its remaining recurring bills
+            month_end = _month_end(date.today().replace(day=1).isoformat())
+            by_cat = self.db.monthly_totals_by_category(through=month_end)
+            forecast = self._predict_seasonal(by_cat)
+            if forecast is None:
+                forecast = self._predict_linear(by_cat, months_back)
+
+        next_start = _month_key(_month_index(date.today().strftime("%Y-%m")) + 1) + "-01"
+        next_end = _month_end(next_start)
+        scheduled: Dict[str, float] = {}
+        for row in self.db.scheduled_expenses(next_start, next_end):
+            scheduled[row["category"]] = scheduled.get(row["category"], 0.0) + row["amount"]
+        per_category = forecast["per_category_next_month"]
+        for category, amount in scheduled.items():
+            per_category[category] = max(per_category.get(category, 0.0), amount)
+        forecast["total_next_month"] = max(forecast["total_next_month"], sum(scheduled.values()))
+        return forecast
+
+    def _cached_seasonal(self) -> Optional[Dict]:
+        """Forecast straight from the stored states when nothing changed since they were saved.
+
+        The states record the data version they were computed at and the last month they
+        absorbed; if neither moved, no history needs to be read at all.
+        """
+        stored = self.db.load_forecast_states()
+        total = stored.get(TOTAL_SERIES)
+        last_closed = _month_key(_month_index(date.today().strftime("%Y-%m")) - 1)
+        if total is None or total.get("through") != last_closed or total.get("data_version") != self.db.data_version():
+            return None
+        return self._seasonal_forecast(stored)
+
+    def _seasonal_forecast(self, states: Dict[str, Dict]) -> Optional[Dict]:
+        # States end at the last closed month; next calendar month is two steps ahead
+        horizon = 2
+        total_next = _holt_winters_forecast(states[TOTAL_SERIES], horizon)
+        if total_next < 0:
+            return None
+        per_category_next: Dict[str, float] = {}
+        for name, state in states.items():
+            if name == TOTAL_SERIES or not state.get("active", True):
+                continue
+            per_category_next[name] = max(0.0, _holt_winters_forecast(state, horizon))
+        return {"total_next_month": float(total_next), "per_category_next_month": per_category_next, "model": "holt-winters"}
+
+    def _predict_seasonal(self, by_cat: Dict[str, Dict[str, float]]) -> Optional[Dict]:
+        """Holt-Winters forecast over closed months, with model state kept in the database.
+
+        Stored states are advanced by one O(1) step per month closed since they were saved.
+        They are refitted only when history they already absorbed has changed (for example,
+        an old statement was imported), which a stored running sum of the series detects.
+        `by_cat` comes from the monthly spend counters, so even that costs O(months), never
+        a pass over the expenses themselves.
+        """
+        # Read before the aggregation, so a write racing with it only forces one more refresh
+        version = self.db.data_version()
+        current = _month_index(date.today().strftime("%Y-%m"))
+        closed = sorted(k for k in by_cat if _month_index(k) < current)
+        if not closed:
+            return None
+        first = _month_index(closed[0])
+        if current - first < 2 * SEASON_LENGTH:
+            return None
+
+        months = [_month_key(i) for i in range(first, current)]
+        series: Dict[str, List[float]] = {
+            TOTAL_SERIES: [max(0.0, float(sum(by_cat.get(k, {}).values()))) for k in months]
+        }
+        for category in sorted({c for k in months for c in by_cat.get(k, {})}):
+            series[category] = [max(0.0, float(by_cat.get(k, {}).get(category, 0.0))) for k in months]
+
+        stored = self.db.load_forecast_states()
+        states: Dict[str, Dict] = {}
+        for name, values in series.items():
+            state = stored.get(name)
+            if state is not None:
+                seen = state["t"]
+                if state.get("first") != months[0] or seen > len(values) or abs(sum(values[:seen]) - state["history_sum"]) > 0.005:
+                    state = None
+            if state is None:
+                state = _holt_winters_fit(values)
+                state["first"] = months[0]
+                state["history_sum"] = sum(values)
+            else:
+                for y in values[state["t"]:]:
+                    _holt_winters_step(state, y)
+                    state["history_sum"] += y
+            state["active"] = sum(values[-SEASON_LENGTH:]) > 0
+            states[name] = state
+        states[TOTAL_SERIES]["through"] = months[-1]
+        states[TOTAL_SERIES]["data_version"] = version
+        if states != stored:
+            self.db.save_forecast_states(states)
+        return self._seasonal_forecast(states)
+
+    def _predict_linear(self, by_cat: Dict[str, Dict[str, float]], months_back: int = 6) -> Dict:
+        """Linear-trend fallback for short histories.
 
         Improvements over the naive version:
         - Safely clamps the lookback window to available months
@@ -39,9 +220,9 @@ class Predictor:
         - Builds per-category series with implicit zeros for missing months
         - Ensures non-negative outputs
         """
-        monthly_totals = self.db.monthly_totals()
+        monthly_totals = {k: sum(month_map.values()) for k, month_map in by_cat.items()}
         if not monthly_totals:
-            return {"total_next_month": 0.0, "per_category_next_month": {}}
+            return {"total_next_month": 0.0, "per_category_next_month": {}, "model": "linear"}
 
         # Sort keys chronologically; keys are YYYY-MM strings so lexicographic works,
         # but we still keep this explicit to document the intent.
@@ -63,7 +244,6 @@ class Predictor:
         total_next = max(0.0, float(total_next))
 
         # Per-category projection
-        by_cat = self.db.monthly_totals_by_category()
         per_category_next: Dict[str, float] = {}
 
         if by_cat:
@@ -95,7 +275,7 @@ class Predictor:
             for category, cat_total in last_cats.items():
                 per_category_next[category] = total_next * (float(cat_total) / float(last_total))
 
-        return {"total_next_month": total_next, "per_category_next_month": per_category_next}
+        return {"total_next_month": total_next, "per_category_next_month": per_category_next, "model": "linear"}
 
 
 
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import calendar
+import heapq
+import threading
+import time
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from db import ExpenseDB
+
+
+FREQUENCIES = ("daily", "weekly", "monthly", "custom")
+
+
+def _step_days(rule: Dict) -> int:
+    interval = max(1, int(rule["interval"]))
+    if rule["frequency"] == "weekly":
+        return 7 * interval
+    # "daily" and "custom" (every N days)
+    return interval
+
+
+def occurrence_date(rule: Dict, n: int) -> date:
+    """Date of the n-th occurrence of a rule (n = 0 is the start date).
+
+    Monthly rules keep the day of month of the start date, clamped to shorter months
+    (a rule starting on the 31st falls on Feb 28/29).
+    """
+    start = date.fromisoformat(rule["start_date"])
+    if rule["frequency"] == "monthly":
+        months = start.month - 1 + n * max(1, int(rule["interval"]))
+        year, month = start.year + months // 12, months % 12 + 1
+        return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+    return start + timedelta(days=n * _step_days(rule))
+
+
+def _first_index_on_or_after(rule: Dict, day: date) -> int:
+    """Smallest occurrence index whose date is >= day, computed arithmetically."""
+    start = date.fromisoformat(rule["start_date"])
+    if day <= start:
+        return 0
+    if rule["frequency"] == "monthly":
+        interval = max(1, int(rule["interval"]))
+        months = (day.year - start.year) * 12 + day.month - start.month
+        n = max(0, months // interval)
+    else:
+        n = (day - start).days // _step_days(rule)
+    while occurrence_date(rule, n) < day:
+        n += 1
+    return n
+
+
+def expand(rule: Dict, start: Optional[str], end: str) -> Iterator[Tuple[int, date]]:
+    """Yield (index, date) for occurrences not yet materialized that fall in [start, end].
+
+    Occurrences before rule["next_index"] already exist as real rows, so they are skipped.
+    """
+    last = date.fromisoformat(end)
+    if rule.get("end_date"):
+        last = min(last, date.fromisoformat(rule["end_date"]))
+    n = int(rule["next_index"])
+    if start:
+        n = max(n, _first_index_on_or_after(rule, date.fromisoformat(start)))
+    while True:
+        day = occurrence_date(rule, n)
+        if day > last:
+            return
+        yield n, day
+        n += 1
+
+
+def virtual_rows(rules: List[Dict], start: Optional[str], end: str) -> List[Dict]:
+    """Expense-shaped dicts for every pending occurrence of `rules` in [start, end]."""
+    rows: List[Dict] = []
+    for rule in rules:
+        for _, day in expand(rule, start, end):
+            rows.append(
+                {
+                    "id": None,
+                    "date": day.isoformat(),
+                    "amount": float(rule["amount"]),
+                    "description": rule["description"],
+                    "category": rule["category"],
+                    "recurring_id": rule["id"],
+                }
+            )
+    return rows
+
+
+class RecurringScheduler:
+    """Turns recurring occurrences into real expenses once their date arrives.
+
+    Keeps a min-heap of (next_due, rule_id) so the per-request check is a peek at the heap
+    top. The heap is rebuilt from the database every `refresh_seconds`, which picks up rules
+    added by other processes. Materialized rows carry a content hash derived from
+    (rule, occurrence), so several workers racing on the same occurrence insert it once.
+    Threads of one worker share the heap, so it is only touched under a lock.
+    """
+
+    def __init__(self, db: "ExpenseDB", refresh_seconds: float = 60.0) -> None:
+        self.db = db
+        self.refresh_seconds = refresh_seconds
+        self._heap: List[Tuple[str, int]] = []
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def reload(self) -> None:
+        with self._lock:
+            self._reload()
+
+    def _reload(self) -> None:
+        # Ended rules never fall due again; leaving them out keeps refreshes cheap
+        self._heap = [(rule["next_due"], rule["id"]) for rule in self.db.list_recurring(active_only=True)]
+        heapq.heapify(self._heap)
+        self._loaded_at = time.monotonic()
+
+    def run_due(self, today: Optional[str] = None) -> int:
+        """Materialize every occurrence dated on or before `today`. Returns rows created."""
+        with self._lock:
+            return self._run_due(today or date.today().isoformat())
+
+    def _run_due(self, today: str) -> int:
+        if time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self._reload()
+        created = 0
+        while self._heap and self._heap[0][0] <= today:
+            _, rule_id = heapq.heappop(self._heap)
+            rule = self.db.get_recurring(rule_id)
+            if rule is None:
+                continue
+            due = list(expand(rule, None, today))
+            if due:
+                created += self.db.materialize_recurring(rule, due)
+                rule = self.db.get_recurring(rule_id)
+            finished = rule is None or (rule.get("end_date") and rule["next_due"] > rule["end_date"])
+            # Anything still due here was claimed by another process; the next reload sees it
+            if not finished and rule["next_due"] > today:
+                heapq.heappush(self._heap, (rule["next_due"], rule_id))
+        return created
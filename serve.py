@@ -0,0 +1,102 @@
+"""Production entry point: pre-forked gunicorn workers, each with a pool of threads.
+
+    python serve.py --bind 0.0.0.0:8000 --workers 4 --threads 8
+
+Dashboard event streams (/events) each hold one of a worker's threads for as long as the page
+is open, so only --event-streams of them (half the threads by default) are accepted per
+worker; further dashboards are asked to reconnect later and keep working without live updates.
+
+Each worker builds its own ExpenseDB, CategoryRules and Predictor after the fork (see
+app.init_worker), and all of them share the WAL-mode SQLite file. Send SIGHUP to the master
+process for a graceful reload: new workers are started with fresh code and configuration
+while the old ones finish their in-flight requests. gunicorn is POSIX-only; on Windows keep
+using `python app.py` (run.bat).
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict
+
+from gunicorn.app.base import BaseApplication
+
+
+def default_workers() -> int:
+    # Requests are mostly SQLite reads plus template rendering, i.e. CPU-bound Python, so one
+    # process per core; threads cover the time spent waiting on the database file.
+    return max(1, os.cpu_count() or 1)
+
+
+def post_fork(server, worker) -> None:
+    # With --preload the app module was imported in the master; give this worker its own state.
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.init_worker()
+
+
+class ProductionServer(BaseApplication):
+    def __init__(self, options: Dict) -> None:
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        # Without --preload this runs inside each worker, after the fork
+        from app import app
+
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the expense tracker with multiple worker processes")
+    parser.add_argument("--bind", type=str, default=os.environ.get("BIND", "127.0.0.1:8000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", default_workers())))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("THREADS", 8)), help="Threads per worker")
+    parser.add_argument(
+        "--event-streams",
+        type=int,
+        default=os.environ.get("EVENT_STREAMS"),
+        help="Open /events streams allowed per worker (default: half of --threads)",
+    )
+    parser.add_argument("--timeout", type=int, default=30, help="Seconds before a stuck worker is restarted")
+    parser.add_argument("--max-requests", type=int, default=5000, help="Recycle a worker after this many requests (0 = never)")
+    parser.add_argument(
+        "--preload",
+        action="store_true",
+        help="Import the app once in the master (faster start, but SIGHUP no longer reloads code)",
+    )
+    args = parser.parse_args()
+    event_streams = args.threads // 2 if args.event_streams is None else int(args.event_streams)
+    if args.threads - event_streams < 1:
+        parser.error("--event-streams must leave at least one thread per worker for ordinary requests")
+    # Read by app.init_worker in every worker process
+    os.environ["EVENT_STREAMS"] = str(event_streams)
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.timeout,
+        "keepalive": 5,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "preload_app": args.preload,
+        "post_fork": post_fork,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+    print(
+        f"Starting {args.workers} worker(s) x {args.threads} thread(s), "
+        f"up to {event_streams} event stream(s) each, on http://{args.bind}"
+    )
+    ProductionServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
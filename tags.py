@@ -0,0 +1,157 @@
+import re
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Bitmaps are stored per tag in chunks covering this many consecutive expense ids, so an
+# insert rewrites one small compressed blob instead of the tag's whole bitmap.
+CHUNK_BITS = 1 << 16
+CHUNK_BYTES = CHUNK_BITS // 8
+
+STOPWORDS = {
+    "the", "and", "for", "from", "with", "at", "on", "to", "of", "in", "a", "an", "my",
+    "our", "via", "per", "off", "new", "bill", "payment", "purchase", "expense", "misc",
+}
+
+_HASHTAG_RE = re.compile(r"#(\w+)")
+_WORD_RE = re.compile(r"[a-z][a-z']+")
+# Query terms may keep inner apostrophes too, so "mcdonald's" can name the tag it produced
+_TOKEN_RE = re.compile(r"\(|\)|\||,|[-!]|[#\w]+(?:'\w+)*")
+
+_BYTE_BITS = [[bit for bit in range(8) if value >> bit & 1] for value in range(256)]
+
+# Query AST: ("tag", name) | ("not", node) | ("and", left, right) | ("or", left, right)
+Node = Tuple
+
+
+def extract_tags(description: str, category: str) -> List[str]:
+    """Tags for an expense: explicit #hashtags, significant words and the category.
+
+    "Lunch at restaurant" in Food -> ["food", "lunch", "restaurant"].
+    """
+    text = description.lower()
+    tags: Set[str] = set(_HASHTAG_RE.findall(text))
+    for word in _WORD_RE.findall(_HASHTAG_RE.sub(" ", text)):
+        word = word.strip("'")
+        if len(word) >= 3 and word not in STOPWORDS:
+            tags.add(word)
+    if category:
+        tags.add(category.lower())
+    return sorted(tags)
+
+
+def encode_chunk(bits: int) -> bytes:
+    return zlib.compress(bits.to_bytes(CHUNK_BYTES, "little"))
+
+
+def decode_chunk(blob: bytes) -> int:
+    return int.from_bytes(zlib.decompress(blob), "little")
+
+
+def ids_from_bitset(bits: int) -> List[int]:
+    """Set bit positions in ascending order."""
+    if bits <= 0:
+        return []
+    raw = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    ids: List[int] = []
+    for index, byte in enumerate(raw):
+        if byte:
+            base = index * 8
+            ids.extend(base + bit for bit in _BYTE_BITS[byte])
+    return ids
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def parse_tag_query(text: str) -> Optional[Node]:
+    """Parse a tag filter such as "food AND NOT travel", "(uber | ola), -work".
+
+    AND binds tighter than OR; adjacent terms and commas are ANDed; "-" or "!" negates.
+    Returns None for an empty query and raises ValueError on malformed input.
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        return None
+    pos = 0
+
+    def peek() -> Optional[str]:
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take() -> str:
+        nonlocal pos
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or() -> Node:
+        node = parse_and()
+        while peek() is not None and (peek() == "|" or peek().upper() == "OR"):
+            take()
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and() -> Node:
+        node = parse_not()
+        while True:
+            token = peek()
+            if token is None or token == ")" or token == "|" or token.upper() == "OR":
+                return node
+            if token == "," or token.upper() == "AND":
+                take()
+            node = ("and", node, parse_not())
+
+    def parse_not() -> Node:
+        token = peek()
+        if token is None:
+            raise ValueError("Incomplete tag query")
+        if token in {"-", "!"} or token.upper() == "NOT":
+            take()
+            return ("not", parse_not())
+        if token == "(":
+            take()
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError("Unbalanced parentheses in tag query")
+            take()
+            return node
+        if token in {")", "|", ","}:
+            raise ValueError(f"Unexpected '{token}' in tag query")
+        return ("tag", take().lstrip("#").lower())
+
+    node = parse_or()
+    if pos != len(tokens):
+        raise ValueError(f"Unexpected '{tokens[pos]}' in tag query")
+    return node
+
+
+def matches(node: Node, tags: Iterable[str]) -> bool:
+    """Evaluate a query AST against the tag set of a single expense."""
+    present = set(tags)
+    return bool(evaluate(node, lambda name: int(name in present), lambda: 1))
+
+
+def evaluate(node: Node, bitset: Callable[[str], int], universe: Callable[[], int]) -> int:
+    """Evaluate a query AST to a bitset of expense ids. NOT is taken relative to `universe`."""
+    kind = node[0]
+    if kind == "tag":
+        return bitset(node[1])
+    if kind == "not":
+        return universe() & ~evaluate(node[1], bitset, universe)
+    left = evaluate(node[1], bitset, universe)
+    right = evaluate(node[2], bitset, universe)
+    return left & right if kind == "and" else left | right
+
+
+def group_by_chunk(pairs: Iterable[Tuple[int, int]]) -> Dict[Tuple[int, int], int]:
+    """{(tag_id, chunk): bits} for (tag_id, expense_id) pairs."""
+    # Bits are set in bytearrays: OR-ing into a 64K-bit int would copy it for every pair
+    grouped: Dict[Tuple[int, int], bytearray] = {}
+    for tag_id, expense_id in pairs:
+        chunk, offset = divmod(expense_id, CHUNK_BITS)
+        buffer = grouped.get((tag_id, chunk))
+        if buffer is None:
+            buffer = grouped[(tag_id, chunk)] = bytearray(CHUNK_BYTES)
+        buffer[offset >> 3] |= 1 << (offset & 7)
+    return {key: int.from_bytes(buffer, "little") for key, buffer in grouped.items()}
+